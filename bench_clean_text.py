@@ -0,0 +1,101 @@
+"""Throughput of the extracted-text normaliser on saved DCE text.
+
+    python bench_clean_text.py --save path/to/dce_documents   # dump raw PDF text layers first
+    python bench_clean_text.py                                # compare normalisers on samples/dce/*.txt
+
+Each sample holds the raw text layer of one document, pages separated by
+form feeds, exactly as fitz returns it before any cleaning.
+"""
+import os
+import re
+import glob
+import time
+import argparse
+import unicodedata
+
+import fitz  # PyMuPDF
+
+from extraction import PDF_PAGE_LIMIT, clean_extracted_text
+
+SAMPLES_DIR = os.path.join("samples", "dce")
+
+
+def clean_five_passes(text):
+    # Previous implementation of extraction.clean_extracted_text
+    text = unicodedata.normalize("NFKC", text)
+    text = re.sub(r"\n{2,}", "\n", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"Page\s*\d+\s*/\s*\d+", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"[\u0000-\u001f]+", "", text)
+    cleaned_lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    pretty = "\n".join(cleaned_lines)
+    pretty = re.sub(r"\n{3,}", "\n\n", pretty)
+    return pretty.strip()
+
+
+def clean_per_page(pages):
+    # What extract_text_from_pdf does now: clean each page as it is read
+    return "\n".join(t for t in (clean_extracted_text(p) for p in pages) if t)
+
+
+NORMALISERS = {
+    "5 passes, whole document": lambda pages: clean_five_passes("\n".join(pages)),
+    "single pass, whole document": lambda pages: clean_extracted_text("\n".join(pages)),
+    "single pass, page by page": clean_per_page,
+}
+
+
+def save_samples(source_dir, directory):
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for path in sorted(glob.glob(os.path.join(source_dir, "**", "*.pdf"), recursive=True)):
+        try:
+            with fitz.open(path) as doc:
+                pages = [doc[i].get_text("text") for i in range(min(len(doc), PDF_PAGE_LIMIT))]
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+        with open(os.path.join(directory, f"dce_{count:04d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\f".join(pages))
+        count += 1
+    print(f"💾 Saved {count} documents to {directory}")
+
+
+def run(directory, repeat):
+    documents = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, "r", encoding="utf-8") as f:
+            documents.append(f.read().split("\f"))
+    if not documents:
+        raise SystemExit(f"No samples in {directory}, run with --save DIR first.")
+
+    megabytes = sum(len(p.encode("utf-8")) for pages in documents for p in pages) / 1e6
+    print(f"📄 {len(documents)} documents, {megabytes:.1f} MB, {repeat} repeats")
+
+    expected = [clean_extracted_text("\n".join(pages)) for pages in documents]
+    baseline = None
+    for name, clean in NORMALISERS.items():
+        outputs = [clean(pages) for pages in documents]
+        mismatches = sum(o != e for o, e in zip(outputs, expected))
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for pages in documents:
+                clean(pages)
+            best = min(best, time.perf_counter() - started)
+        baseline = baseline or best
+        print(f"{name:<30} {megabytes / best:8.1f} MB/s  x{baseline / best:5.1f}  "
+              f"lines={sum(o.count(chr(10)) + 1 for o in outputs if o):>7}  mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=SAMPLES_DIR, help="directory of saved text samples")
+    parser.add_argument("--save", metavar="DIR", help="dump the text layer of every PDF under DIR and exit")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats, best is kept")
+    args = parser.parse_args()
+
+    if args.save:
+        save_samples(args.save, args.dir)
+    else:
+        run(args.dir, args.repeat)
@@ -0,0 +1,106 @@
+"""Compares the HTTP listing parser with what Chrome reads on saved pages.
+
+    python bench_listing_parse.py --save 3          # save 3 results pages of the HTTP search
+    python bench_listing_parse.py                   # compare parsers on samples/listing/*.html
+
+Every saved page is parsed by listing_http.parse_rows, then opened in
+Chrome (stylesheets loaded) and read by listing.extract_rows, the path
+the Selenium scrapers use; both must give the same rows, field by field.
+"""
+import os
+import glob
+import time
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+
+import lxml.html
+
+import listing
+from browser import make_driver
+from listing_http import SEARCH_URL, iter_result_pages, parse_rows
+
+SAMPLES_DIR = os.path.join("samples", "listing")
+FIELDS = ("reference", "objet", "acheteur", "lieux_execution", "date_limite", "first_button_url")
+
+
+def save_samples(count, directory, start_date):
+    os.makedirs(directory, exist_ok=True)
+    saved = 0
+    for page, rows in iter_result_pages(start_date, max_pages=count):
+        # Absolute links, so the stylesheets still load from a local copy
+        page.make_links_absolute(SEARCH_URL)
+        saved += 1
+        with open(os.path.join(directory, f"listing_{saved:04d}.html"), "wb") as f:
+            f.write(lxml.html.tostring(page, encoding="utf-8", doctype="<!DOCTYPE html>"))
+        print(f"💾 Page {saved}: {len(rows)} rows")
+    print(f"💾 Saved {saved} pages to {directory}")
+
+
+def parse_http(path):
+    parser = lxml.html.HTMLParser(encoding="utf-8")
+    with open(path, "rb") as f:
+        page = lxml.html.document_fromstring(f.read(), parser=parser)
+    return parse_rows(page, SEARCH_URL)
+
+
+def parse_chrome(driver, path):
+    driver.get("file://" + os.path.abspath(path))
+    return listing.extract_rows(driver)
+
+
+def run(directory, show):
+    paths = sorted(glob.glob(os.path.join(directory, "*.html")))
+    if not paths:
+        raise SystemExit(f"No sample pages in {directory}, run with --save N first.")
+
+    # No resource blocking: class-hidden text only disappears with the css
+    driver = make_driver(tempfile.mkdtemp(), profile=None, block=())
+    mismatches = dict.fromkeys(FIELDS, 0)
+    rows_total = missing = 0
+    http_time = chrome_time = 0.0
+    try:
+        for path in paths:
+            started = time.perf_counter()
+            got = parse_http(path)
+            http_time += time.perf_counter() - started
+            started = time.perf_counter()
+            expected = parse_chrome(driver, path)
+            chrome_time += time.perf_counter() - started
+
+            name = os.path.basename(path)
+            if len(got) != len(expected):
+                print(f"⚠️ {name}: {len(got)} rows over HTTP, {len(expected)} in Chrome")
+            missing += abs(len(got) - len(expected))
+            rows_total += len(expected)
+            for i, (row, reference) in enumerate(zip(got, expected)):
+                for field in FIELDS:
+                    if row[field] != reference[field]:
+                        mismatches[field] += 1
+                        if show:
+                            show -= 1
+                            print(f"❌ {name} row {i + 1} {field}:\n"
+                                  f"   http:   {row[field]!r}\n   chrome: {reference[field]!r}")
+    finally:
+        driver.quit()
+
+    print(f"📄 {len(paths)} pages, {rows_total} rows, {missing} rows missing on either side")
+    print(f"⏱️ lxml {1000 * http_time / len(paths):.2f} ms/page, "
+          f"Chrome {1000 * chrome_time / len(paths):.2f} ms/page")
+    for field, count in mismatches.items():
+        print(f"{field:<20} mismatches={count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=SAMPLES_DIR, help="directory of saved listing pages")
+    parser.add_argument("--save", type=int, metavar="N", help="save N results pages and exit")
+    parser.add_argument("--since", default=(datetime.now() - timedelta(days=7)).strftime("%d/%m/%Y"),
+                        help="start date of the saved search (dd/mm/yyyy)")
+    parser.add_argument("--show", type=int, default=10, help="mismatching fields printed at most")
+    args = parser.parse_args()
+
+    if args.save:
+        save_samples(args.save, args.dir, args.since)
+    else:
+        run(args.dir, args.show)
@@ -0,0 +1,88 @@
+"""Micro-benchmark of the PV results-table extractors on saved pages.
+
+    python bench_pv_parse.py --save 50      # download 50 sample PV pages first
+    python bench_pv_parse.py                # compare parsers on samples/pv/*.html
+"""
+import os
+import glob
+import time
+import argparse
+import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer
+
+from browser import USER_AGENT
+from http_client import make_session
+from pv_parser import extract_results_text
+
+SAMPLES_DIR = os.path.join("samples", "pv")
+
+
+def parse_bs4_full(html):
+    # Reference implementation, as previously used in main4.py
+    table = BeautifulSoup(html, "html.parser").find("table", class_="table-results")
+    return table.get_text(separator=" - ", strip=True) if table else None
+
+
+def parse_bs4_strainer(html):
+    # Straining on the class attribute misses multi-class tables, keep all tables
+    soup = BeautifulSoup(html, "lxml", parse_only=SoupStrainer("table"))
+    table = soup.find("table", class_="table-results")
+    return table.get_text(separator=" - ", strip=True) if table else None
+
+
+PARSERS = {
+    "bs4 html.parser (full tree)": parse_bs4_full,
+    "bs4 lxml + SoupStrainer": parse_bs4_strainer,
+    "slice + lxml (pv_parser)": extract_results_text,
+}
+
+
+def save_samples(count, directory):
+    session = make_session({"User-Agent": USER_AGENT})
+    os.makedirs(directory, exist_ok=True)
+    urls = pd.read_excel("URLS.xlsx")["PV"].dropna().sample(count, random_state=0)
+    for i, url in enumerate(urls):
+        response = session.get(url, timeout=15)
+        response.raise_for_status()
+        with open(os.path.join(directory, f"pv_{i:04d}.html"), "w", encoding="utf-8") as f:
+            f.write(response.text)
+    print(f"💾 Saved {len(urls)} pages to {directory}")
+
+
+def run(directory, repeat):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+    if not pages:
+        raise SystemExit(f"No sample pages in {directory}, run with --save N first.")
+
+    megabytes = sum(len(p) for p in pages) / 1e6
+    print(f"📄 {len(pages)} pages, {megabytes:.1f} MB, {repeat} repeats")
+
+    expected = [parse_bs4_full(p) for p in pages]
+    baseline = None
+    for name, parse in PARSERS.items():
+        mismatches = sum(parse(p) != e for p, e in zip(pages, expected))
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for page in pages:
+                parse(page)
+            best = min(best, time.perf_counter() - started)
+        baseline = baseline or best
+        print(f"{name:<30} {1000 * best / len(pages):8.2f} ms/page  "
+              f"x{baseline / best:5.1f}  mismatches={mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=SAMPLES_DIR, help="directory of saved PV pages")
+    parser.add_argument("--save", type=int, metavar="N", help="download N sample pages and exit")
+    parser.add_argument("--repeat", type=int, default=3, help="timing repeats, best is kept")
+    args = parser.parse_args()
+
+    if args.save:
+        save_samples(args.save, args.dir)
+    else:
+        run(args.dir, args.repeat)
@@ -0,0 +1,234 @@
+import os
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Persistent Chrome profiles (HTTP cache, cookies), one sub-directory per
+# session name; cached between CI runs so sessions start warm
+PROFILE_DIR = os.environ.get("BROWSER_PROFILE_DIR", os.path.join(os.getcwd(), ".browser-profile"))
+# Comma separated resource types not loaded at all (images, fonts, css);
+# empty to load everything. css is opt-in: without stylesheets the listing
+# may lay out differently, so check its rows still match before adding it
+BLOCK_RESOURCES = [r for r in os.environ.get("BROWSER_BLOCK_RESOURCES", "images,fonts").split(",") if r]
+# Sessions a BrowserPool starts at most
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", 3))
+
+DISK_CACHE_BYTES = 100 * 1024 * 1024
+
+BLOCKED_EXTENSIONS = {
+    "images": ["png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp"],
+    "fonts": ["woff", "woff2", "ttf", "otf", "eot"],
+    "css": ["css"],
+}
+
+# Left behind by a Chrome that did not exit cleanly (or by another machine,
+# for a restored CI cache); Chrome then refuses the profile
+PROFILE_LOCKS = ("SingletonLock", "SingletonSocket", "SingletonCookie")
+
+# -----------------------------
+# DRIVER FACTORY
+# -----------------------------
+def make_options(download_dir, headless="--headless=chrome", user_agent=USER_AGENT, profile_path=None):
+    options = webdriver.ChromeOptions()
+    options.add_argument(headless)
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option("useAutomationExtension", False)
+    if user_agent:
+        options.add_argument(f"user-agent={user_agent}")
+    if profile_path:
+        options.add_argument(f"--user-data-dir={profile_path}")
+        options.add_argument(f"--disk-cache-size={DISK_CACHE_BYTES}")
+        options.add_argument("--no-first-run")
+
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+    }
+    options.add_experimental_option("prefs", prefs)
+    return options
+
+def blocked_urls(resources):
+    """setBlockedURLs patterns for the resource types, with or without a query string."""
+    return [p for r in resources for ext in BLOCKED_EXTENSIONS[r] for p in (f"*.{ext}", f"*.{ext}?*")]
+
+def block_resources(driver, resources=BLOCK_RESOURCES):
+    """Makes Chrome drop requests for images, fonts and/or stylesheets."""
+    if resources:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls(resources)})
+
+def set_download_dir(driver, download_dir):
+    """Points a running session's downloads at `download_dir`."""
+    os.makedirs(download_dir, exist_ok=True)
+    driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_dir})
+
+def unlock_profile(profile_path):
+    for name in PROFILE_LOCKS:
+        try:
+            os.unlink(os.path.join(profile_path, name))
+        except FileNotFoundError:
+            pass
+
+def make_driver(download_dir, page_load_timeout=60, profile="default", block=BLOCK_RESOURCES, **option_kwargs):
+    """Starts a Chrome session that downloads into its own directory.
+
+    `profile` names a persistent profile under PROFILE_DIR (None for a
+    throwaway one); two running sessions must not share a name.
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    profile_path, warm = None, False
+    if profile:
+        profile_path = os.path.join(PROFILE_DIR, profile)
+        warm = os.path.isdir(profile_path)
+        os.makedirs(profile_path, exist_ok=True)
+        unlock_profile(profile_path)
+
+    started = time.monotonic()
+    options = make_options(download_dir, profile_path=profile_path, **option_kwargs)
+    driver = webdriver.Chrome(service=Service(), options=options)
+    driver.set_page_load_timeout(page_load_timeout)
+    block_resources(driver, block)
+    state = f"{'warm' if warm else 'new'} profile {profile}" if profile else "no profile"
+    print(f"🌐 Chrome started in {time.monotonic() - started:.1f}s ({state})")
+    return driver
+
+# -----------------------------
+# SESSION POOL
+# -----------------------------
+class BrowserPool:
+    """Chrome sessions started on demand and lent out in turn.
+
+    A session goes back to the pool instead of quitting, so the next
+    caller skips the startup and keeps its cookies and HTTP cache:
+
+        with pool.session(download_dir) as driver:
+            driver.get(url)
+
+    Sessions that raised a WebDriverException are quit rather than reused.
+    Each pool slot has its own persistent profile, `<name>-<slot>`.
+    """
+
+    def __init__(self, size=POOL_SIZE, name="pool", **driver_kwargs):
+        self.size = size
+        self.name = name
+        self.driver_kwargs = driver_kwargs
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.free_slots = list(range(size, 0, -1))
+        self.slots = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def acquire(self, download_dir):
+        """An idle session, a new one while the pool is not full, or else
+        the next one released. Its downloads go to `download_dir`."""
+        while True:
+            driver = self.next_driver(download_dir)
+            try:
+                set_download_dir(driver, download_dir)
+                return driver
+            except WebDriverException:
+                # Chrome died while idle
+                self.release(driver, broken=True)
+
+    def next_driver(self, download_dir):
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                slot = self.free_slots.pop() if self.free_slots else None
+            if slot is not None:
+                return self.start(slot, download_dir)
+            try:
+                # Rechecked every second: a broken session frees its slot
+                return self.idle.get(timeout=1)
+            except queue.Empty:
+                pass
+
+    def start(self, slot, download_dir):
+        try:
+            driver = make_driver(download_dir, profile=f"{self.name}-{slot}", **self.driver_kwargs)
+        except Exception:
+            with self.lock:
+                self.free_slots.append(slot)
+            raise
+        with self.lock:
+            self.slots[driver] = slot
+        return driver
+
+    def release(self, driver, broken=False):
+        """Returns a session to the pool, or quits it if it is `broken`."""
+        if driver not in self.slots:
+            return  # already quit by close()
+        if not broken:
+            try:
+                # Popups opened by the last caller are closed
+                handles = driver.window_handles
+                for handle in handles[1:]:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                driver.switch_to.window(handles[0])
+            except WebDriverException:
+                broken = True
+        if broken:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            with self.lock:
+                slot = self.slots.pop(driver, None)
+                if slot is not None:
+                    self.free_slots.append(slot)
+        else:
+            self.idle.put(driver)
+
+    @contextmanager
+    def session(self, download_dir):
+        driver = self.acquire(download_dir)
+        try:
+            yield driver
+        except WebDriverException:
+            self.release(driver, broken=True)
+            raise
+        except BaseException:
+            self.release(driver)
+            raise
+        self.release(driver)
+
+    def close(self):
+        with self.lock:
+            drivers = list(self.slots)
+            self.slots.clear()
+            self.free_slots = list(range(self.size, 0, -1))
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.idle = queue.LifoQueue()
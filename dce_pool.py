@@ -0,0 +1,205 @@
+import os
+import time
+import queue
+import random
+import shutil
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
+
+from browser import BrowserPool
+from downloads import DownloadWatcher
+from extraction import clear_directory, extract_pages, merge_pages
+import extraction_cache
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+BROWSER_WORKERS = int(os.environ.get("DCE_BROWSER_WORKERS", 3))
+# Extraction processes; OCR inside each one fans out to its own pool (ocr.py)
+CPU_WORKERS = int(os.environ.get("DCE_CPU_WORKERS", 2))
+DOWNLOAD_TIMEOUT = int(os.environ.get("DCE_DOWNLOAD_TIMEOUT", 120))
+
+# Result of a tender whose page never loaded; None means no document was downloaded
+SKIPPED = object()
+# "merged_text" of a tender without a downloaded DCE
+NO_DOCUMENT = "No document downloaded"
+
+# -----------------------------
+# DOWNLOAD HELPERS
+# -----------------------------
+def open_tender(driver, link):
+    """Loads a tender page. Returns False when it keeps timing out."""
+    try:
+        driver.get(link)
+    except TimeoutException:
+        print(f"⚠️ Timeout loading {link}, retrying...")
+        try:
+            driver.execute_script("window.stop();")
+            driver.execute_script("window.location.href = arguments[0];", link)
+        except TimeoutException:
+            print(f"❌ Still timed out, skipping this tender.")
+            return False
+    time.sleep(3)
+    return True
+
+def download_dce(driver, wait, download_dir, fields):
+    """Fills the DCE request form of the open tender and downloads it.
+
+    Returns the DownloadWatcher: its wait() result is the file, and its
+    size and seconds describe the transfer.
+    """
+    download_link = wait.until(EC.element_to_be_clickable((By.ID, "ctl0_CONTENU_PAGE_linkDownloadDce")))
+    driver.execute_script("arguments[0].scrollIntoView(true);", download_link)
+    download_link.click()
+
+    # Fill form
+    for fid, value in fields.items():
+        try:
+            inp = wait.until(EC.presence_of_element_located((By.ID, fid)))
+            inp.clear()
+            inp.send_keys(value)
+        except:
+            pass # Sometimes fields are pre-filled
+
+    # Accept terms
+    try:
+        checkbox = driver.find_element(By.ID, "ctl0_CONTENU_PAGE_EntrepriseFormulaireDemande_accepterConditions")
+        if not checkbox.is_selected():
+            checkbox.click()
+    except:
+        pass
+
+    valider_button = wait.until(EC.element_to_be_clickable((By.ID, "ctl0_CONTENU_PAGE_validateButton")))
+    driver.execute_script("arguments[0].scrollIntoView({block:'center'});", valider_button)
+    time.sleep(0.5)
+    try:
+        valider_button.click()
+    except ElementClickInterceptedException:
+        driver.execute_script("arguments[0].click();", valider_button)
+
+    final_button = wait.until(EC.element_to_be_clickable((By.ID, "ctl0_CONTENU_PAGE_EntrepriseDownloadDce_completeDownload")))
+    driver.execute_script("arguments[0].scrollIntoView(true);", final_button)
+    with DownloadWatcher(download_dir) as watcher:
+        final_button.click()
+        print("✅ Download started.")
+        watcher.wait(DOWNLOAD_TIMEOUT)
+    return watcher
+
+# -----------------------------
+# WORKER POOL
+# -----------------------------
+def browser_worker(worker_id, tasks, results, downloads, ready, cpu_pool, browsers, fields, work_dir):
+    """Pulls tenders off the queue with a pooled browser and its own download directory.
+
+    Each finished download is moved to a per-tender directory and handed to
+    the CPU pool, so the browser moves on while the document is extracted.
+    """
+    download_dir = os.path.join(work_dir, f"worker-{worker_id}")
+    try:
+        driver = browsers.acquire(download_dir)
+    except Exception as e:
+        print(f"❌ [W{worker_id}] Could not start browser: {e}")
+        return
+    wait = WebDriverWait(driver, 30)
+    print(f"✅ [W{worker_id}] WebDriver initialized.")
+
+    try:
+        while True:
+            try:
+                idx, row = tasks.get_nowait()
+            except queue.Empty:
+                return
+
+            link = row["first_button_url"]
+            print(f"\n🔗 [W{worker_id}] Processing tender {idx+1}: {link}")
+            if not open_tender(driver, link):
+                results[idx] = SKIPPED
+                ready[idx].set()
+                continue
+
+            future = None
+            try:
+                download = download_dce(driver, wait, download_dir, fields)
+                if download.path:
+                    downloads[idx] = {"download_bytes": download.size, "download_seconds": round(download.seconds, 1)}
+                    tender_dir = os.path.join(work_dir, f"tender-{idx}")
+                    os.makedirs(tender_dir, exist_ok=True)
+                    moved = shutil.move(download.path, tender_dir)
+                    future = cpu_pool.submit(extract_pages, moved)
+                    future.add_done_callback(lambda _, d=tender_dir: shutil.rmtree(d, ignore_errors=True))
+                else:
+                    print("⚠️ Download failed or timed out.")
+            except Exception as e:
+                print(f"⚠️ [W{worker_id}] Error processing tender {link}: {e}")
+
+            results[idx] = future
+            ready[idx].set()
+            clear_directory(download_dir)
+            time.sleep(random.uniform(2, 4))
+    finally:
+        browsers.release(driver)
+
+def iter_tenders(rows, fields, work_dir, browser_workers=BROWSER_WORKERS, cpu_workers=CPU_WORKERS, browsers=None):
+    """Downloads and extracts the DCE of every (idx, row dict) pair.
+
+    Yields the rows, in input order and as soon as each one is done, with
+    a "merged_text" column added. Tenders whose page never loaded are
+    dropped, as in the serial loop.
+
+    Browsers come from `browsers` (a BrowserPool) when given, so sessions
+    the caller already started are reused; otherwise from a pool of its own.
+    """
+    rows = list(rows)
+    tasks = queue.Queue()
+    for idx, row in rows:
+        tasks.put((idx, row))
+    results = {}
+    downloads = {}
+    ready = {idx: threading.Event() for idx, _ in rows}
+
+    own_browsers = browsers is None
+    if own_browsers:
+        browsers = BrowserPool(browser_workers, name="dce")
+
+    print(f"🚀 Processing {len(rows)} tenders with {browser_workers} browsers and {cpu_workers} extraction processes")
+    # Fork the extraction processes before any browser thread starts
+    with ProcessPoolExecutor(cpu_workers, mp_context=multiprocessing.get_context("fork")) as cpu_pool:
+        cpu_pool.submit(int).result()
+
+        threads = [
+            threading.Thread(target=browser_worker, args=(i + 1, tasks, results, downloads, ready, cpu_pool, browsers, fields, work_dir), daemon=True)
+            for i in range(min(browser_workers, len(rows)))
+        ]
+        for thread in threads:
+            thread.start()
+
+        for idx, row in rows:
+            # Tenders left in the queue when every browser died are never ready
+            while not ready[idx].wait(1):
+                if not any(thread.is_alive() for thread in threads):
+                    break
+            if results.get(idx) is SKIPPED:
+                continue  # page never loaded
+            merged_text = NO_DOCUMENT
+            future = results.get(idx)
+            if future is not None:
+                try:
+                    merged_text = merge_pages(future.result())
+                except Exception as e:
+                    print(f"⚠️ Extraction failed for tender {idx+1}: {e}")
+            # Every row has every column: sinks take their columns from the first batch
+            download = downloads.get(idx, {"download_bytes": None, "download_seconds": None})
+            yield {**row, **download, "merged_text": merged_text}
+    if own_browsers:
+        browsers.close()
+    extraction_cache.prune()
+
+def process_tenders(rows, fields, work_dir, browser_workers=BROWSER_WORKERS, cpu_workers=CPU_WORKERS, browsers=None):
+    """iter_tenders() as a list."""
+    return list(iter_tenders(rows, fields, work_dir, browser_workers, cpu_workers, browsers))
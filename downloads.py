@@ -0,0 +1,141 @@
+import os
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+# Polling interval when inotify is not available
+POLL_INTERVAL = 0.2
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+_libc = None
+
+# -----------------------------
+# INOTIFY
+# -----------------------------
+def libc():
+    """libc with the inotify calls, or None off Linux."""
+    global _libc
+    if _libc is None:
+        try:
+            lib = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            lib.inotify_init1, lib.inotify_add_watch
+            _libc = lib
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+def inotify_watch(directory, mask):
+    """A non-blocking inotify fd watching `directory`, or None if unsupported."""
+    lib = libc()
+    if lib is None:
+        return None
+    fd = lib.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    if lib.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def read_events(fd):
+    """Yields (mask, name) for the queued inotify events."""
+    try:
+        buf = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return
+    offset = 0
+    while offset < len(buf):
+        _, mask, _, length = EVENT_HEADER.unpack_from(buf, offset)
+        offset += EVENT_HEADER.size
+        name = buf[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+        offset += length
+        yield mask, name
+
+# -----------------------------
+# DOWNLOAD COMPLETION
+# -----------------------------
+def is_partial(name):
+    return name.endswith(".crdownload") or name.startswith(".com.google.Chrome.")
+
+def finished_file(download_dir):
+    """The downloaded file, once Chrome has no partial file left, else None.
+
+    Chrome reserves the final name with an empty file and renames the
+    .crdownload over it at the end, so an empty final file is not done.
+    """
+    names = os.listdir(download_dir)
+    if any(is_partial(n) for n in names):
+        return None
+    for name in names:
+        path = os.path.join(download_dir, name)
+        if os.path.isfile(path) and os.path.getsize(path) > 0:
+            return path
+    return None
+
+class DownloadWatcher:
+    """Waits for the next Chrome download in a directory to finish.
+
+    Open it before triggering the download so the reported duration
+    covers the whole transfer:
+
+        with DownloadWatcher(download_dir) as watcher:
+            button.click()
+            path = watcher.wait(timeout=120)
+
+    On Linux completion is signalled by inotify (the rename of the
+    .crdownload, or the close of a file written in place), elsewhere
+    the directory is polled every POLL_INTERVAL seconds.
+    """
+
+    def __init__(self, download_dir):
+        self.download_dir = download_dir
+        self.fd = None
+        self.started = None
+        self.path = None
+        self.seconds = None
+        self.size = None
+
+    def __enter__(self):
+        self.fd = inotify_watch(self.download_dir, IN_CLOSE_WRITE | IN_MOVED_TO)
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def wait(self, timeout=120):
+        """Path of the finished download, or None after `timeout` seconds."""
+        deadline = self.started + timeout
+        path = finished_file(self.download_dir)
+        while path is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print("⚠️ Timeout waiting for download to finish.")
+                return None
+            if self.fd is None:
+                time.sleep(min(POLL_INTERVAL, remaining))
+            else:
+                ready, _, _ = select.select([self.fd], [], [], remaining)
+                if not ready or not any(not is_partial(name) for _, name in read_events(self.fd)):
+                    continue
+            path = finished_file(self.download_dir)
+
+        self.path = path
+        self.seconds = time.monotonic() - self.started
+        self.size = os.path.getsize(path)
+        print(f"📥 {os.path.basename(path)}: {self.size / 1024:.0f} KB in {self.seconds:.1f}s")
+        return path
+
+def wait_for_download_complete(download_dir, timeout=120):
+    with DownloadWatcher(download_dir) as watcher:
+        return watcher.wait(timeout)
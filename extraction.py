@@ -0,0 +1,319 @@
+import io
+import os
+import re
+import shutil
+import zipfile
+import unicodedata
+
+# PDF / OCR / DOC
+import fitz  # PyMuPDF
+import docx
+
+from ocr import OCR_DPI, OCR_GRAYSCALE, ocr_pdf
+from legacy_docs import extract_legacy
+from extraction_cache import cached_extract
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+# Pages extracted per PDF when its file name matches no DOCUMENT_BUDGETS entry
+PDF_PAGE_LIMIT = int(os.environ.get("PDF_PAGE_LIMIT", 10))
+# Pages whose text layer is read to find the ones worth extracting
+PDF_SCAN_LIMIT = int(os.environ.get("PDF_SCAN_LIMIT", 40))
+# Useful characters after which a PDF stops taking pages, and a tender
+# stops reading documents
+TEXT_TARGET_CHARS = int(os.environ.get("TEXT_TARGET_CHARS", 40000))
+# ZIPs inside ZIPs are followed this deep
+MAX_ZIP_DEPTH = 3
+
+# A page is OCR'd when its text layer is this thin and images cover this
+# much of it; thin pages without images are blank, not scanned
+MIN_PAGE_TEXT_CHARS = 50
+MIN_IMAGE_COVERAGE = 0.3
+
+# Scope headings: pages carrying one are extracted before the others
+HEADINGS_RE = re.compile(
+    r"\bobjet\b|consistance des prestations|description des prestations|"
+    r"termes de r[ée]f[ée]rence|contenu de la mission|[ée]tendue des prestations|موضوع",
+    re.IGNORECASE,
+)
+
+# Page budget by document kind, matched on the file name. Documents are
+# read in this order, unmatched ones last with PDF_PAGE_LIMIT pages
+DOCUMENT_BUDGETS = [
+    (re.compile(r"tdr|termes|cctp|technique", re.IGNORECASE), 20),
+    (re.compile(r"(?<![a-z])rc(?![a-z])|r[ée]glement|avis", re.IGNORECASE), PDF_PAGE_LIMIT),
+    (re.compile(r"bordereau|bpu|bpdq?e|d[ée]tail estimatif", re.IGNORECASE), 3),
+]
+
+# Configuration an extraction result depends on, part of its cache key so
+# that changing any of it does not serve results made with the old values
+CACHE_SETTINGS = ":".join(map(str, (
+    PDF_SCAN_LIMIT, TEXT_TARGET_CHARS, MIN_PAGE_TEXT_CHARS, MIN_IMAGE_COVERAGE, OCR_DPI, OCR_GRAYSCALE,
+)))
+
+# merge_pages() result when no document yielded any text
+NO_TEXT = "No relevant text extracted"
+
+# -----------------------------
+# TEXT EXTRACTION
+# -----------------------------
+# Page footers like "Page 3 / 12"
+PAGE_FOOTER_RE = re.compile(r"page\s*\d+\s*/\s*\d+", re.IGNORECASE)
+# Control characters that str.split() does not already treat as whitespace
+CONTROL_CHARS_RE = re.compile(r"[\x00-\x08\x0e-\x1b]+")
+
+def clean_lines(text):
+    """Yields the non-empty lines of `text`, NFKC-normalised, with footers and
+    control characters removed and runs of whitespace collapsed.
+
+    Single pass over the lines; each step is skipped by a cheap str check
+    when the line does not need it.
+    """
+    for line in text.replace("\r", "\n").split("\n"):
+        if not line.isascii() and not unicodedata.is_normalized("NFKC", line):
+            line = unicodedata.normalize("NFKC", line)
+        if not line.isprintable():
+            line = CONTROL_CHARS_RE.sub("", line)
+        if "/" in line:
+            line = PAGE_FOOTER_RE.sub("", line)
+        line = " ".join(line.split())
+        if line:
+            yield line
+
+def clean_extracted_text(text):
+    # Line-local, so cleaning pages one by one and joining them with "\n"
+    # gives the same result as cleaning the whole document
+    return "\n".join(clean_lines(text))
+
+def image_coverage(page):
+    """Fraction of the page area covered by images (overlaps counted twice)."""
+    area = abs(page.rect)
+    if not area:
+        return 0.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return min(1.0, covered / area)
+
+def needs_ocr(page, text):
+    return len(text.strip()) < MIN_PAGE_TEXT_CHARS and image_coverage(page) >= MIN_IMAGE_COVERAGE
+
+def open_pdf(source):
+    """Opens a PDF from a path or from its bytes."""
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+def page_record(page, method, text):
+    """One extracted page. iter_pages() adds the "file" it came from."""
+    return {"page": page, "method": method, "text": text}
+
+def select_pages(texts, budget, target=TEXT_TARGET_CHARS):
+    """Page numbers to extract from {page: text layer}: pages with a scope
+    heading first, then the rest in order, until `budget` pages or `target`
+    characters of text layer. Scanned pages count for nothing until OCR'd."""
+    ranked = sorted(texts, key=lambda n: (not HEADINGS_RE.search(texts[n]), n))
+    chosen = []
+    chars = 0
+    for n in ranked[:budget]:
+        if chars >= target:
+            break
+        chosen.append(n)
+        chars += len(texts[n])
+    return sorted(chosen)
+
+def pdf_pages(source, name=None, budget=PDF_PAGE_LIMIT):
+    """(page records of the most relevant `budget` pages, text layer or OCR,
+    complete). Not complete when some scanned page could not be OCR'd."""
+    name = name or source
+    texts = {}
+    scanned = set()
+    try:
+        doc = open_pdf(source)
+        for i in range(min(len(doc), PDF_SCAN_LIMIT)):
+            page = doc[i]
+            texts[i + 1] = clean_extracted_text(page.get_text("text"))
+            if needs_ocr(page, texts[i + 1]):
+                scanned.add(i + 1)
+        doc.close()
+    except Exception as e:
+        print(f"⚠️ Could not read PDF {name}: {e}")
+
+    chosen = select_pages(texts, budget)
+    pages = {n: page_record(n, "text", texts[n]) for n in chosen}
+    ocr_pages = [n for n in chosen if n in scanned]
+    complete = True
+    if ocr_pages:
+        try:
+            # Only scanned pages are rendered and OCR'd, in parallel, within a time budget
+            texts = ocr_pdf(source, ocr_pages, name=name)
+            for n, text in texts.items():
+                pages[n] = page_record(n, "ocr", clean_extracted_text(text))
+            # Pages that failed or ran out of time are left out
+            complete = len(texts) == len(ocr_pages)
+        except Exception as e:
+            print(f"⚠️ OCR failed for {name}: {e}")
+            complete = False
+    return [pages[n] for n in sorted(pages) if pages[n]["text"]], complete
+
+def docx_pages(source, name=None, budget=None):
+    # DOCX has no pages until rendered: the whole body is page 1
+    try:
+        doc = docx.Document(io.BytesIO(source) if isinstance(source, bytes) else source)
+        text = clean_extracted_text("\n".join(p.text for p in doc.paragraphs if p.text.strip()))
+    except Exception:
+        return [], True
+    return ([page_record(1, "docx", text)] if text else []), True
+
+def legacy_pages(source, name=None, budget=None):
+    """.doc/.rtf/.odt/.xls/.xlsx files, converted in a killable worker pool.
+    Not complete when the conversion timed out."""
+    if not isinstance(source, bytes):
+        name = name or source
+        with open(source, "rb") as f:
+            source = f.read()
+    ext = os.path.splitext(name or "")[1].lower()
+    raw = extract_legacy(source, ext, name)
+    text = clean_extracted_text(raw or "")
+    return ([page_record(1, ext.lstrip("."), text)] if text else []), raw is not None
+
+def join_pages(pages):
+    return "\n".join(p["text"] for p in pages)
+
+def extract_text_from_pdf(source, name=None):
+    return join_pages(pdf_pages(source, name)[0])
+
+def extract_text_from_docx(source, name=None):
+    return join_pages(docx_pages(source, name)[0])
+
+def extract_text_from_doc(source, name=None):
+    return join_pages(legacy_pages(source, name or "document.doc")[0])
+
+PAGE_EXTRACTORS = {
+    ".pdf": pdf_pages,
+    ".docx": docx_pages,
+    ".doc": legacy_pages,
+    ".rtf": legacy_pages,
+    ".odt": legacy_pages,
+    ".xls": legacy_pages,
+    ".xlsx": legacy_pages,
+}
+
+# -----------------------------
+# ARCHIVES
+# -----------------------------
+def is_wanted(name):
+    """Whether a file or archive member is worth reading, decided from its name."""
+    fname = os.path.basename(name)
+    ext = os.path.splitext(fname)[1].lower()
+    if "cps" in fname.lower():
+        print(f"SKIPPED CPS: {fname}")
+        return False
+    if ext != ".zip" and ext not in PAGE_EXTRACTORS:
+        print(f"SKIPPED UNSUPPORTED: {fname}")
+        return False
+    return True
+
+def document_budget(name):
+    """(read order, PDF page budget) of a document, from its file name."""
+    fname = os.path.basename(name)
+    for rank, (pattern, budget) in enumerate(DOCUMENT_BUDGETS):
+        if pattern.search(fname):
+            return rank, budget
+    return len(DOCUMENT_BUDGETS), PDF_PAGE_LIMIT
+
+def iter_zip_documents(archive, depth=0, target_reached=None):
+    """Yields (member name, bytes) for every wanted document in a ZIP.
+
+    `archive` is a path or a file object. Members are filtered by name
+    before being decompressed and read in DOCUMENT_BUDGETS order; nested
+    ZIPs are read from memory. Once `target_reached()` is true the members
+    left are skipped without being decompressed.
+    """
+    try:
+        zf = zipfile.ZipFile(archive)
+    except (zipfile.BadZipFile, OSError) as e:
+        print(f"⚠️ Failed to unzip {getattr(archive, 'name', archive)}: {e}")
+        return
+    with zf:
+        members = [i for i in zf.infolist() if not i.is_dir() and is_wanted(i.filename)]
+        for info in sorted(members, key=lambda i: document_budget(i.filename)[0]):
+            if target_reached and target_reached():
+                print(f"SKIPPED (text target reached): {os.path.basename(info.filename)}")
+                continue
+            try:
+                data = zf.read(info)
+            except (zipfile.BadZipFile, RuntimeError, OSError) as e:
+                print(f"⚠️ Failed to read {info.filename}: {e}")
+                continue
+            if info.filename.lower().endswith(".zip"):
+                if depth >= MAX_ZIP_DEPTH:
+                    print(f"SKIPPED NESTED ZIP: {info.filename}")
+                    continue
+                yield from iter_zip_documents(io.BytesIO(data), depth + 1, target_reached)
+            else:
+                yield info.filename, data
+
+def iter_pages(downloaded_file):
+    """Yields the page records of every supported document in a downloaded
+    DCE (file or ZIP), document by document, each tagged with its "file".
+
+    ZIP members are extracted from memory, nothing is unpacked to disk.
+    Documents left once TEXT_TARGET_CHARS were collected are skipped.
+    """
+    collected = 0
+    if downloaded_file.lower().endswith(".zip"):
+        documents = iter_zip_documents(downloaded_file, target_reached=lambda: collected >= TEXT_TARGET_CHARS)
+    elif is_wanted(downloaded_file):
+        with open(downloaded_file, "rb") as f:
+            documents = [(downloaded_file, f.read())]
+    else:
+        documents = []
+
+    for name, data in documents:
+        fname = os.path.basename(name)
+        ext = os.path.splitext(fname)[1].lower()
+        extract = PAGE_EXTRACTORS[ext]
+        _, budget = document_budget(fname)
+        # Cached records carry no file name: the same bytes may come under another one.
+        # Extractors return (records, complete); partial results are not cached
+        pages = cached_extract(data, f"{ext}:{budget}", lambda d: extract(d, fname, budget), CACHE_SETTINGS)
+        chars = sum(len(p["text"]) for p in pages)
+        collected += chars
+        print(f"EXTRACTED {chars} chars from {len(pages)} pages of {fname}")
+        for page in pages:
+            yield {"file": fname, **page}
+
+def extract_pages(downloaded_file):
+    """iter_pages() as a list. Runs in a worker process, so everything it
+    needs lives in this module."""
+    return list(iter_pages(downloaded_file))
+
+def merge_pages(pages):
+    """One text for a tender: pages of a file on consecutive lines, files
+    separated by a blank line."""
+    parts = []
+    previous = None
+    for page in pages:
+        if previous is not None:
+            parts.append("\n\n" if page["file"] != previous else "\n")
+        parts.append(page["text"])
+        previous = page["file"]
+    return "".join(parts) or NO_TEXT
+
+def extract_download(downloaded_file):
+    """Merged text of every supported document in a downloaded DCE (file or ZIP)."""
+    return merge_pages(iter_pages(downloaded_file))
+
+# -----------------------------
+# DOWNLOAD DIRECTORY HELPERS
+# -----------------------------
+def clear_directory(directory):
+    for item in os.listdir(directory):
+        path = os.path.join(directory, item)
+        try:
+            if os.path.isfile(path) or os.path.islink(path):
+                os.unlink(path)
+            elif os.path.isdir(path):
+                shutil.rmtree(path)
+        except Exception as e:
+            print(f"⚠️ Failed to delete {path}: {e}")
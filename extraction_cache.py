@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+CACHE_DIR = os.environ.get("EXTRACTION_CACHE_DIR", ".extraction-cache")
+CACHE_MAX_BYTES = int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+# Bump when extraction output changes, so stale results are not served
+CACHE_VERSION = "4"
+
+# -----------------------------
+# CONTENT-ADDRESSED EXTRACTION CACHE
+# -----------------------------
+def cache_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key[:2], key + ".json")
+
+def get(key, cache_dir=CACHE_DIR):
+    """Cached result for `key`, or None. A hit refreshes the entry's LRU time."""
+    path = cache_path(key, cache_dir)
+    try:
+        with open(path, encoding="utf-8") as f:
+            value = json.load(f)
+    except (OSError, ValueError):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return value
+
+def put(key, value, cache_dir=CACHE_DIR):
+    """Stores a JSON-serialisable `value` atomically, so concurrent extraction processes never see half a file."""
+    path = cache_path(key, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Could not cache extraction {key[:12]}: {e}")
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+def cached_extract(data, ext, extract, settings="", cache_dir=CACHE_DIR):
+    """Returns the result of extract(data), reusing it for any document with the same bytes.
+
+    `extract` returns (result, complete). Only complete results are
+    cached: one cut short (OCR out of time, a killed converter) is
+    extracted again next time. Empty complete results are cached too: a
+    scan OCR'd to nothing will not get better on the next run.
+
+    The key also covers the extension (it picks the extractor),
+    `settings` (the configuration the result depends on) and
+    CACHE_VERSION.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    key = hashlib.sha256(f"{CACHE_VERSION}:{ext}:{settings}:{digest}".encode()).hexdigest()
+    value = get(key, cache_dir)
+    if value is not None:
+        print(f"♻️ Cache hit for {digest[:12]}{ext}")
+        return value
+    value, complete = extract(data)
+    if complete:
+        put(key, value, cache_dir)
+    else:
+        print(f"⚠️ Partial extraction of {digest[:12]}{ext} not cached")
+    return value
+
+def prune(max_bytes=CACHE_MAX_BYTES, cache_dir=CACHE_DIR):
+    """Evicts least recently used entries until the cache fits in `max_bytes`."""
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            # Leftovers of a crashed put()
+            if name.endswith(".tmp") and st.st_mtime < time.time() - 3600:
+                os.unlink(path)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        evicted += 1
+    print(f"🗄️ Extraction cache: {len(entries) - evicted} entries, {total / 1e6:.1f} MB"
+          + (f" ({evicted} evicted)" if evicted else ""))
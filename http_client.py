@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# -----------------------------
+# RATE LIMITING
+# -----------------------------
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Reserve a token under the lock, then sleep outside it until the
+        # reservation is due, so waiting threads are served in arrival order.
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, created on first use."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.capacity)
+        bucket.acquire()
+
+# -----------------------------
+# POOLED SESSIONS
+# -----------------------------
+class SessionMetrics:
+    """Thread-safe counters for retries and connection reuse."""
+
+    def __init__(self):
+        self.counts = {"retries": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def snapshot(self, session=None):
+        with self.lock:
+            stats = dict(self.counts)
+        if session is not None:
+            stats.update(connection_stats(session))
+        return stats
+
+
+class CountingRetry(Retry):
+    """Retry that reports every retry attempt to a SessionMetrics."""
+
+    metrics = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.metrics = self.metrics
+        return retry
+
+    def increment(self, *args, **kwargs):
+        if self.metrics is not None:
+            self.metrics.count("retries")
+        return super().increment(*args, **kwargs)
+
+
+def make_session(headers=None, pool_size=8, retries=4, backoff=0.5, metrics=None):
+    """Returns a keep-alive Session with a connection pool of `pool_size` per host.
+
+    Connection errors, read timeouts, resets and 5xx/429 answers are retried
+    with exponential backoff (backoff, 2*backoff, 4*backoff, ... seconds),
+    honouring Retry-After when the server sends one.
+    """
+    retry = CountingRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    retry.metrics = metrics
+
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def connection_stats(session):
+    """Counts requests sent and connections opened by the session's pools."""
+    sent = opened = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                sent += pool.num_requests
+                opened += pool.num_connections
+    return {"requests": sent, "connections_opened": opened, "connections_reused": max(0, sent - opened)}
+
+# -----------------------------
+# CONCURRENT FETCHING
+# -----------------------------
+def fetch_all(jobs, fetch, concurrency=8, limiter=None):
+    """Runs fetch(url) for every (key, url) in jobs on a bounded thread pool.
+
+    Yields (key, url, result, error) in completion order. At most
+    2 * concurrency jobs are in flight, so a consumer that stops iterating
+    early only leaves a handful of requests to finish.
+    """
+    def run(url):
+        if limiter:
+            limiter.acquire(url)
+        return fetch(url)
+
+    jobs = iter(jobs)
+    window = 2 * concurrency
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = {}
+    try:
+        while True:
+            while len(pending) < window:
+                job = next(jobs, None)
+                if job is None:
+                    break
+                key, url = job
+                pending[executor.submit(run, url)] = (key, url)
+            if not pending:
+                return
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key, url = pending.pop(future)
+                try:
+                    yield key, url, future.result(), None
+                except Exception as e:
+                    yield key, url, None, e
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,151 @@
+"""Include/exclude keyword rules for tender listings and DCE texts.
+
+Rules live in KEYWORD_RULES_FILE (keyword_rules.json), one section per
+kind of text:
+
+    {
+      "listing":   {"fields": ["objet"], "include": [], "exclude": ["travaux", ...]},
+      "documents": {"include": ["intelligence artificielle"], "exclude": []}
+    }
+
+A text is kept when it contains one of the `include` terms (or there are
+none) and none of the `exclude` terms. Terms match anywhere in the text,
+ignoring case and accents.
+"""
+import os
+import re
+import json
+import unicodedata
+
+import ahocorasick
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+KEYWORD_RULES_FILE = os.environ.get("KEYWORD_RULES_FILE", "keyword_rules.json")
+
+INCLUDE = 1
+EXCLUDE = 2
+
+# Joins the texts of a column into one string scanned in a single pass;
+# no folded term contains it, so every text starts from the root state
+SEPARATOR = "\x00"
+
+# Combining marks left by NFKD: Latin accents, Arabic tashkeel
+MARKS_RE = re.compile(r"[\u0300-\u036f\u0610-\u061a\u064b-\u065f\u0670]")
+
+# -----------------------------
+# FOLDING
+# -----------------------------
+def fold(text):
+    """Lower-case `text` without accents or compatibility forms."""
+    return MARKS_RE.sub("", unicodedata.normalize("NFKD", text)).lower()
+
+# -----------------------------
+# AHO-CORASICK AUTOMATON
+# -----------------------------
+class KeywordAutomaton:
+    """Finds every term of a fixed set in one pass over the text, however
+    many terms there are. Each term carries INCLUDE or EXCLUDE bits."""
+
+    def __init__(self, terms):
+        # terms: {term: bits}
+        self.automaton = ahocorasick.Automaton()
+        for term, bits in terms.items():
+            term = fold(term).replace(SEPARATOR, "").strip()
+            if term:
+                # Terms equal once folded share one entry
+                _, seen = self.automaton.get(term, (term, 0))
+                self.automaton.add_word(term, (term, seen | bits))
+        self.terms = list(self.automaton.keys())
+        if self.terms:
+            self.automaton.make_automaton()
+
+    def scan(self, text):
+        """[(end position, bits, term)] of the matches in an already folded text."""
+        if not self.terms:
+            return []
+        return [(end, bits, term) for end, (term, bits) in self.automaton.iter(text)]
+
+    def find(self, text):
+        """(INCLUDE/EXCLUDE bits, terms in order of first appearance) of `text`."""
+        flags, found = 0, {}
+        for _, bits, term in self.scan(fold(text)):
+            flags |= bits
+            found.setdefault(term, None)
+        return flags, list(found)
+
+    def flags(self, texts):
+        """INCLUDE/EXCLUDE bits of every text of a Series, as a uint8 array.
+
+        Duplicate texts are scanned once, and the distinct ones are folded
+        and scanned as one joined string; hits are mapped back to their
+        text by position.
+        """
+        texts = texts.fillna("").astype(str).str.replace(SEPARATOR, " ", regex=False)
+        codes, uniques = pd.factorize(texts, sort=False)
+        unique_flags = np.zeros(len(uniques), dtype=np.uint8)
+        if len(uniques) and len(self.terms):
+            folded = fold(SEPARATOR.join(uniques))
+            lengths = np.fromiter((len(t) + 1 for t in folded.split(SEPARATOR)), dtype=np.int64, count=len(uniques))
+            hits = self.scan(folded)
+            if hits:
+                positions = np.fromiter((end for end, _, _ in hits), dtype=np.int64, count=len(hits))
+                bits = np.fromiter((bits for _, bits, _ in hits), dtype=np.uint8, count=len(hits))
+                rows = np.searchsorted(np.cumsum(lengths), positions, side="right")
+                np.bitwise_or.at(unique_flags, rows, bits)
+        return unique_flags[codes]
+
+# -----------------------------
+# RULES
+# -----------------------------
+class KeywordRules:
+    def __init__(self, include=(), exclude=(), fields=("objet",)):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.fields = list(fields)
+        terms = dict.fromkeys(self.include, INCLUDE)
+        for term in self.exclude:
+            terms[term] = terms.get(term, 0) | EXCLUDE
+        self.automaton = KeywordAutomaton(terms)
+
+    def __bool__(self):
+        return bool(self.automaton.terms)
+
+    def keep(self, flags):
+        """Which of the INCLUDE/EXCLUDE `flags` pass the rules."""
+        flags = np.asarray(flags, dtype=np.uint8)
+        wanted = (flags & INCLUDE).astype(bool) if self.include else np.ones(flags.shape, dtype=bool)
+        return wanted & ~(flags & EXCLUDE).astype(bool)
+
+    def mask(self, df):
+        """Boolean Series: rows of `df` whose `fields` pass the rules.
+
+        An include term may match in any field, an exclude term in any
+        field rejects the row.
+        """
+        flags = np.zeros(len(df), dtype=np.uint8)
+        for field in self.fields:
+            if field in df:
+                flags |= self.automaton.flags(df[field])
+        return pd.Series(self.keep(flags), index=df.index)
+
+    def filter(self, df):
+        return df[self.mask(df)]
+
+    def check(self, text):
+        """(passes, matched terms) for a single text, e.g. a DCE."""
+        flags, found = self.automaton.find(text or "")
+        return bool(self.keep(flags)), found
+
+def load_rules(section, path=KEYWORD_RULES_FILE):
+    """The KeywordRules of a section of the rules file; no rules (everything
+    passes) if the file or section is missing."""
+    if not os.path.exists(path):
+        print(f"⚠️ No keyword rules file at {path}, nothing is filtered.")
+        return KeywordRules()
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f).get(section, {})
+    return KeywordRules(config.get("include", ()), config.get("exclude", ()), config.get("fields", ("objet",)))
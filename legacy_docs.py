@@ -0,0 +1,125 @@
+import io
+import os
+import zipfile
+import tempfile
+import subprocess
+import multiprocessing
+
+from lxml import etree
+import openpyxl
+import xlrd
+from striprtf.striprtf import rtf_to_text
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+# Converter processes per extraction process
+LEGACY_WORKERS = int(os.environ.get("LEGACY_WORKERS", 1))
+# Seconds one document may take before its worker is killed
+LEGACY_TIMEOUT = float(os.environ.get("LEGACY_TIMEOUT", 60))
+
+ODT_TEXT_TAGS = {
+    "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}p",
+    "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}h",
+}
+
+_pool = None
+_pool_pid = None
+
+# -----------------------------
+# CONVERTERS (run in the pool)
+# -----------------------------
+def doc_to_text(data):
+    # antiword only reads files
+    with tempfile.NamedTemporaryFile(suffix=".doc") as tmp:
+        tmp.write(data)
+        tmp.flush()
+        result = subprocess.run(["antiword", tmp.name], capture_output=True, timeout=LEGACY_TIMEOUT)
+    return result.stdout.decode("utf-8", errors="ignore")
+
+def rtf_text(data):
+    # RTF is 7-bit; accented characters come as \'xx escapes that striprtf decodes
+    return rtf_to_text(data.decode("latin-1"), errors="ignore")
+
+def odt_to_text(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        content = zf.read("content.xml")
+    lines = []
+    for _, el in etree.iterparse(io.BytesIO(content), events=("end",), tag=ODT_TEXT_TAGS):
+        lines.append("".join(el.itertext()))
+        el.clear()
+    return "\n".join(lines)
+
+def sheet_lines(title, rows):
+    yield f"[{title}]"
+    for row in rows:
+        cells = [str(v).strip() for v in row if v is not None and str(v).strip()]
+        if cells:
+            yield " | ".join(cells)
+
+def xlsx_to_text(data):
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        return "\n".join(line for ws in wb.worksheets for line in sheet_lines(ws.title, ws.iter_rows(values_only=True)))
+    finally:
+        wb.close()
+
+def xls_to_text(data):
+    wb = xlrd.open_workbook(file_contents=data, on_demand=True)
+    lines = []
+    for sheet in wb.sheets():
+        lines.extend(sheet_lines(sheet.name, (sheet.row_values(i) for i in range(sheet.nrows))))
+        wb.unload_sheet(sheet.name)
+    return "\n".join(lines)
+
+CONVERTERS = {
+    ".doc": doc_to_text,
+    ".rtf": rtf_text,
+    ".odt": odt_to_text,
+    ".xlsx": xlsx_to_text,
+    ".xls": xls_to_text,
+}
+
+def convert(ext, data):
+    return CONVERTERS[ext](data)
+
+# -----------------------------
+# WORKER POOL
+# -----------------------------
+def get_pool():
+    """The converter pool of this process (forked extraction workers get their own)."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = multiprocessing.get_context("fork").Pool(LEGACY_WORKERS)
+        _pool_pid = os.getpid()
+    return _pool
+
+def kill_pool():
+    global _pool
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.terminate()
+    _pool = None
+
+def extract_legacy(data, ext, name=None):
+    """Raw text of a .doc/.rtf/.odt/.xls/.xlsx document, "" if it cannot be
+    converted, or None if the conversion timed out (worth another try).
+
+    Runs in a pool process so a document that hangs the parser can be
+    killed: past LEGACY_TIMEOUT the whole pool is terminated and the next
+    call starts a fresh one.
+    """
+    name = name or ext
+    result = get_pool().apply_async(convert, (ext, data))
+    try:
+        # antiword has its own timeout; the margin lets it report first
+        return result.get(timeout=LEGACY_TIMEOUT + 5)
+    except multiprocessing.TimeoutError:
+        print(f"⏱️ {name} still running after {LEGACY_TIMEOUT:.0f}s, killing its worker")
+        kill_pool()
+        return None
+    except subprocess.TimeoutExpired:
+        print(f"⏱️ antiword timed out on {name}")
+        return None
+    except Exception as e:
+        print(f"⚠️ Could not extract {name}: {e}")
+    return ""
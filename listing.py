@@ -0,0 +1,166 @@
+import os
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import StaleElementReferenceException
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+ROWS_XPATH = '//table[@class="table-results"]/tbody/tr'
+DATA_ROWS_XPATH = '//table[@class="table-results"]/tbody/tr[not(contains(@class, "table-header"))]'
+
+# "js" reads a whole page in one WebDriver call; "webdriver" is the old
+# six-calls-per-row path, kept to compare timings
+EXTRACT_MODE = os.environ.get("LISTING_EXTRACT_MODE", "js")
+
+# Seconds spent extracting each page, in order
+page_timings = []
+
+# Seconds spent waiting for each page swap, in order
+wait_timings = []
+
+# Returns one object per row, with the same fields the WebDriver path reads
+EXTRACT_ROWS_JS = r"""
+const first = (context, xpath) => document.evaluate(
+    xpath, context, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const text = (el) => (el.innerText || el.textContent || "").trim();
+const rows = document.evaluate(
+    arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const out = [];
+for (let i = 0; i < rows.snapshotLength; i++) {
+    const row = rows.snapshotItem(i);
+    const fields = {
+        ref: row.querySelector(".col-450 .ref"),
+        objet: first(row, './/div[contains(@id,"panelBlocObjet")]'),
+        buyer: first(row, './/div[contains(@id,"panelBlocDenomination")]'),
+        lieux: first(row, './/div[contains(@id,"panelBlocLieuxExec")]'),
+        deadline: first(row, './/td[@headers="cons_dateEnd"]'),
+        first_button: first(row, './/td[@class="actions"]//a[1]'),
+    };
+    const missing = Object.keys(fields).filter((name) => !fields[name]);
+    if (missing.length) {
+        out.push({error: "missing " + missing.join(", ")});
+        continue;
+    }
+    out.push({
+        ref: text(fields.ref),
+        objet: text(fields.objet),
+        buyer: text(fields.buyer),
+        lieux: text(fields.lieux),
+        deadline: text(fields.deadline),
+        first_button: fields.first_button.href || fields.first_button.getAttribute("href"),
+    });
+}
+return out;
+"""
+
+# First row element and its reference text, or [null, null]
+FIRST_ROW_JS = r"""
+const row = document.evaluate(
+    arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!row) return [null, null];
+const ref = row.querySelector(".col-450 .ref");
+return [row, ref ? (ref.innerText || ref.textContent || "").trim() : null];
+"""
+
+# -----------------------------
+# ROW EXTRACTION
+# -----------------------------
+def row_record(ref, objet, buyer, lieux, deadline, first_button):
+    return {
+        "reference": ref,
+        "objet": objet.replace("Objet : ", ""),
+        "acheteur": buyer.replace("Acheteur public : ", ""),
+        "lieux_execution": lieux.replace("\n", ", "),
+        "date_limite": deadline.replace("\n", " "),
+        "first_button_url": first_button,
+    }
+
+def extract_rows_js(driver, rows_xpath):
+    records = []
+    for raw in driver.execute_script(EXTRACT_ROWS_JS, rows_xpath):
+        if "error" in raw:
+            print(f"⚠️ Error extracting row: {raw['error']}")
+            continue
+        records.append(row_record(**raw))
+    return records
+
+def extract_rows_webdriver(driver, rows_xpath):
+    records = []
+    for row in driver.find_elements(By.XPATH, rows_xpath):
+        try:
+            records.append(row_record(
+                ref=row.find_element(By.CSS_SELECTOR, '.col-450 .ref').text,
+                objet=row.find_element(By.XPATH, './/div[contains(@id,"panelBlocObjet")]').text,
+                buyer=row.find_element(By.XPATH, './/div[contains(@id,"panelBlocDenomination")]').text,
+                lieux=row.find_element(By.XPATH, './/div[contains(@id,"panelBlocLieuxExec")]').text,
+                deadline=row.find_element(By.XPATH, './/td[@headers="cons_dateEnd"]').text,
+                first_button=row.find_element(By.XPATH, './/td[@class="actions"]//a[1]').get_attribute("href"),
+            ))
+        except Exception as e:
+            print(f"⚠️ Error extracting row: {e}")
+    return records
+
+def extract_rows(driver, rows_xpath=ROWS_XPATH, mode=None):
+    """Returns the listing rows of the current page as dicts, timing the extraction."""
+    mode = mode or EXTRACT_MODE
+    extract = extract_rows_webdriver if mode == "webdriver" else extract_rows_js
+    started = time.perf_counter()
+    records = extract(driver, rows_xpath)
+    elapsed = time.perf_counter() - started
+    page_timings.append(elapsed)
+    print(f"⏱️ Extracted {len(records)} rows in {elapsed:.2f}s ({mode})")
+    return records
+
+# -----------------------------
+# PAGE CHANGE DETECTION
+# -----------------------------
+def first_row(driver, rows_xpath=ROWS_XPATH):
+    """Snapshot of the current first row, to pass to wait_for_table_swap()."""
+    row, ref = driver.execute_script(FIRST_ROW_JS, rows_xpath)
+    return row, ref
+
+def is_stale(element):
+    try:
+        element.is_enabled()
+        return False
+    except StaleElementReferenceException:
+        return True
+
+def wait_for_table_swap(driver, before, rows_xpath=ROWS_XPATH, timeout=30, poll=0.1):
+    """Waits until the results table differs from the `before` snapshot.
+
+    The table counts as swapped once a first row is present again and either
+    the old first row went stale (PRADO re-rendered the page) or the first
+    reference changed. Returns the seconds waited, raises TimeoutException.
+    """
+    old_row, old_ref = before
+
+    def swapped(d):
+        row, ref = d.execute_script(FIRST_ROW_JS, rows_xpath)
+        if row is None:
+            return False
+        if old_row is None or is_stale(old_row):
+            return True
+        return ref != old_ref
+
+    started = time.perf_counter()
+    WebDriverWait(driver, timeout, poll_frequency=poll,
+                  ignored_exceptions=(StaleElementReferenceException,)).until(swapped)
+    elapsed = time.perf_counter() - started
+    wait_timings.append(elapsed)
+    print(f"⏱️ New page ready after {elapsed:.2f}s")
+    return elapsed
+
+def timing_summary():
+    if not page_timings:
+        return "no pages extracted"
+    total = sum(page_timings)
+    summary = (f"{len(page_timings)} pages in {total:.1f}s, "
+               f"{total / len(page_timings):.2f}s per page ({EXTRACT_MODE})")
+    if wait_timings:
+        summary += (f"; page swaps waited {sum(wait_timings):.1f}s, "
+                    f"{sum(wait_timings) / len(wait_timings):.2f}s on average")
+    return summary
@@ -0,0 +1,230 @@
+import re
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+from browser import USER_AGENT
+from http_client import make_session
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+SEARCH_URL = "https://www.marchespublics.gov.ma/index.php?page=entreprise.EntrepriseAdvancedSearch&searchAnnCons"
+
+# PRADO control ids (the form field name is the id with "_" replaced by "$")
+SEARCH_BUTTON_ID = "ctl0_CONTENU_PAGE_AdvancedSearch_lancerRecherche"
+DATE_FIELD_IDS = (
+    "ctl0_CONTENU_PAGE_AdvancedSearch_dateMiseEnLigneStart",
+    "ctl0_CONTENU_PAGE_AdvancedSearch_dateMiseEnLigneCalculeStart",
+)
+KEYWORD_FIELD_ID = "ctl0_CONTENU_PAGE_AdvancedSearch_keywordSearch"
+PAGE_SIZE_ID = "ctl0_CONTENU_PAGE_resultSearch_listePageSizeTop"
+NEXT_PAGE_ID = "ctl0_CONTENU_PAGE_resultSearch_PagerTop_ctl2"
+
+
+class ListingHTTPError(Exception):
+    """The search could not be replayed over plain HTTP."""
+
+# -----------------------------
+# COMPILED ROW PARSER
+# -----------------------------
+# libxml2 does not add the implicit <tbody> a browser does, so rows may
+# also sit directly under <table>
+RESULTS_TABLE = '//table[contains(concat(" ", normalize-space(@class), " "), " table-results ")]'
+ROWS = etree.XPath(f'({RESULTS_TABLE}/tbody/tr | {RESULTS_TABLE}/tr)[not(contains(@class, "table-header"))]')
+REF = etree.XPath('.//*[contains(concat(" ", @class, " "), " col-450 ")]'
+                  '//*[contains(concat(" ", @class, " "), " ref ")]')
+OBJET = etree.XPath('.//div[contains(@id,"panelBlocObjet")]')
+BUYER = etree.XPath('.//div[contains(@id,"panelBlocDenomination")]')
+LIEUX = etree.XPath('.//div[contains(@id,"panelBlocLieuxExec")]')
+DEADLINE = etree.XPath('.//td[@headers="cons_dateEnd"]')
+FIRST_ACTION = etree.XPath('.//td[@class="actions"]//a[1]/@href')
+HIDDEN_STYLE_RE = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.IGNORECASE)
+# Classes the site's stylesheets hide: "info-bulle" holds the full text of
+# a truncated objet or lieux d'exécution, shown only as a hover tooltip
+HIDDEN_CLASSES = {"info-bulle", "hidden", "hide", "d-none", "invisible"}
+BLOCK_TAGS = {"br", "div", "p", "li", "tr", "ul", "table"}
+
+
+def rendered_text(element):
+    """Approximates Selenium's WebElement.text: visible text, one line per block."""
+    parts = []
+
+    def walk(el):
+        if HIDDEN_STYLE_RE.search(el.get("style", "")) or HIDDEN_CLASSES.intersection(el.get("class", "").split()):
+            return
+        tag = el.tag if isinstance(el.tag, str) else None
+        if tag in BLOCK_TAGS:
+            parts.append("\n")
+        if tag and tag not in ("script", "style") and el.text:
+            parts.append(el.text)
+        for child in el:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if tag in BLOCK_TAGS:
+            parts.append("\n")
+
+    walk(element)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def first_text(xpath, row):
+    found = xpath(row)
+    return rendered_text(found[0]) if found else None
+
+
+def parse_rows(page, base_url):
+    """Extracts the listing rows with the same fields as the Selenium scrapers."""
+    data = []
+    for row in ROWS(page):
+        ref = first_text(REF, row)
+        objet = first_text(OBJET, row)
+        buyer = first_text(BUYER, row)
+        lieux = first_text(LIEUX, row)
+        deadline = first_text(DEADLINE, row)
+        actions = FIRST_ACTION(row)
+        if None in (ref, objet, buyer, lieux, deadline) or not actions:
+            continue  # same rows the Selenium loop skips with "Error extracting row"
+        data.append({
+            "reference": ref,
+            "objet": objet.replace("Objet : ", ""),
+            "acheteur": buyer.replace("Acheteur public : ", ""),
+            "lieux_execution": lieux.replace("\n", ", "),
+            "date_limite": deadline.replace("\n", " "),
+            "first_button_url": urljoin(base_url, actions[0]),
+        })
+    return data
+
+# -----------------------------
+# PRADO FORM REPLAY
+# -----------------------------
+class PradoForm:
+    """The page's PRADO form: field values plus the hidden page state."""
+
+    def __init__(self, page, base_url):
+        forms = [f for f in page.forms if "PRADO_PAGESTATE" in f.inputs.keys()]
+        if not forms:
+            raise ListingHTTPError("no PRADO form (PRADO_PAGESTATE) on the page")
+        form = forms[0]
+        self.action = urljoin(base_url, form.get("action") or base_url)
+        self.fields = {}
+        self.buttons = {}
+        self.ids = {}
+        for el in form.inputs:
+            name = el.get("name")
+            if not name:
+                continue
+            if el.get("id"):
+                self.ids[el.get("id")] = name
+            kind = el.get("type", "text").lower() if el.tag == "input" else el.tag
+            if kind in ("submit", "image", "button"):
+                self.buttons[name] = el.get("value", "")
+                continue
+            if kind in ("reset", "file"):
+                continue
+            if kind in ("checkbox", "radio") and not el.checked:
+                continue
+            value = el.value
+            if isinstance(value, (list, tuple, set)):
+                value = next(iter(value), "")
+            self.fields[name] = "" if value is None else value
+        self.page = page
+
+    def name_of(self, element_id):
+        return self.ids.get(element_id, element_id.replace("_", "$"))
+
+    def has(self, element_id):
+        return element_id in self.ids
+
+    def set(self, element_id, value):
+        self.fields[self.name_of(element_id)] = value
+
+    def select_by_label(self, name_pattern, label):
+        """Selects the option labelled `label` in the first select matching name_pattern."""
+        for select in self.page.xpath("//select[@name]"):
+            if re.search(name_pattern, select.get("name"), re.IGNORECASE):
+                for option in select.xpath("./option"):
+                    if option.text_content().strip().lower() == label.lower():
+                        self.fields[select.get("name")] = option.get("value")
+                        return True
+        return False
+
+    def postback(self, element_id, parameter=""):
+        """Form data for a postback fired by the given control."""
+        data = dict(self.fields)
+        data["PRADO_POSTBACK_TARGET"] = self.name_of(element_id)
+        data["PRADO_POSTBACK_PARAMETER"] = parameter
+        name = self.name_of(element_id)
+        if name in self.buttons:
+            data[name] = self.buttons[name]  # a clicked submit button posts its own value
+        return data
+
+
+def load(response):
+    response.raise_for_status()
+    parser = lxml.html.HTMLParser(encoding=response.encoding or "utf-8")
+    page = lxml.html.document_fromstring(response.content, parser=parser, base_url=response.url)
+    return page, PradoForm(page, response.url)
+
+
+def iter_result_pages(start_date, keyword=None, category=None, page_size="500",
+                      session=None, max_pages=None, timeout=60):
+    """Replays the advanced search as plain HTTP POSTs and yields
+    (page, rows) for every results page.
+
+    `category` is the label of the "catégorie" option to select (e.g.
+    "Services"). Raises ListingHTTPError when the page does not look like
+    what the Selenium scrapers drive, so callers can fall back to them.
+    """
+    session = session or make_session({"User-Agent": USER_AGENT}, pool_size=2)
+
+    page, form = load(session.get(SEARCH_URL, timeout=timeout))
+    if not form.has(SEARCH_BUTTON_ID):
+        raise ListingHTTPError("search button not found in the form")
+    for field_id in DATE_FIELD_IDS:
+        if form.has(field_id):
+            form.set(field_id, start_date)
+    if keyword is not None:
+        form.set(KEYWORD_FIELD_ID, keyword)
+    if category and not form.select_by_label(r"categorie", category):
+        raise ListingHTTPError(f"category {category!r} not found in the form")
+
+    page, form = load(session.post(form.action, data=form.postback(SEARCH_BUTTON_ID), timeout=timeout))
+
+    if form.has(PAGE_SIZE_ID):
+        form.set(PAGE_SIZE_ID, page_size)
+        page, form = load(session.post(form.action, data=form.postback(PAGE_SIZE_ID), timeout=timeout))
+
+    seen_first = set()
+    page_number = 1
+    while True:
+        rows = parse_rows(page, form.action)
+        if not rows or rows[0]["reference"] + rows[0]["first_button_url"] in seen_first:
+            break  # empty page, or the pager did not move
+        seen_first.add(rows[0]["reference"] + rows[0]["first_button_url"])
+        yield page, rows
+
+        next_links = page.get_element_by_id(NEXT_PAGE_ID, None)
+        if next_links is None or "aspNetDisabled" in (next_links.get("class") or "") or next_links.get("disabled"):
+            break
+        if max_pages and page_number >= max_pages:
+            break
+        page, form = load(session.post(form.action, data=form.postback(NEXT_PAGE_ID), timeout=timeout))
+        page_number += 1
+
+
+def fetch_listing(start_date, keyword=None, category=None, page_size="500",
+                  session=None, max_pages=None, timeout=60):
+    """Every row of the advanced search replayed over HTTP (see iter_result_pages)."""
+    data = []
+    pages = iter_result_pages(start_date, keyword, category, page_size, session, max_pages, timeout)
+    for page_number, (_, rows) in enumerate(pages, 1):
+        data.extend(rows)
+        print(f"📄 [HTTP] Page {page_number}: {len(rows)} rows ({len(data)} total)")
+
+    if not data:
+        raise ListingHTTPError("no rows in the search response")
+    return data
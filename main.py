@@ -1,29 +1,20 @@
 import os
 import time
-import re
-import shutil
-import zipfile
-import subprocess
-import unicodedata
 import random
-import pandas as pd
-from datetime import datetime, timedelta
-
-# PDF / OCR / DOC
-import fitz  # PyMuPDF
-from pdf2image import convert_from_path
-from PIL import Image
-import pytesseract
-import docx
 
 # Selenium
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
 
+from browser import make_driver
+
+# Plain HTTP listing engine, Selenium is only the fallback
+from listing_http import fetch_listing
+from listing import ROWS_XPATH, extract_rows, first_row, timing_summary, wait_for_table_swap
+from sinks import EXPORT_EXCEL, export_excel, open_sink
+
 # -----------------------------
 # CONFIGURATION
 # -----------------------------
@@ -31,123 +22,22 @@ print("🚀 Initializing configuration...")
 download_dir = os.path.join(os.getcwd(), "downloads_temp")
 os.makedirs(download_dir, exist_ok=True)
 
-options = webdriver.ChromeOptions()
-options.add_argument("--headless=new")  # headless mode
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--window-size=1920,1080")
-options.add_argument("--disable-gpu")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_experimental_option("excludeSwitches", ["enable-automation"])
-options.add_experimental_option("useAutomationExtension", False)
-
-prefs = {
-    "download.default_directory": download_dir,
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-}
-options.add_experimental_option("prefs", prefs)
-
-service = Service()
-driver = webdriver.Chrome(service=service, options=options)
-wait = WebDriverWait(driver, 25)
-driver.set_page_load_timeout(40)
-print("✅ WebDriver initialized.")
-
-PDF_PAGE_LIMIT = 10
-
-# -----------------------------
-# HELPER FUNCTIONS
-# -----------------------------
-def clean_extracted_text(text):
-    text = unicodedata.normalize("NFKC", text)
-    text = re.sub(r"\n{2,}", "\n", text)
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"Page\s*\d+\s*/\s*\d+", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"[\u0000-\u001f]+", "", text)
-    cleaned_lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    pretty = "\n".join(cleaned_lines)
-    pretty = re.sub(r"\n{3,}", "\n\n", pretty)
-    return pretty.strip()
-
-def extract_text_from_pdf(file_path):
-    text = ""
-    try:
-        doc = fitz.open(file_path)
-        page_count = min(len(doc), PDF_PAGE_LIMIT)
-        for i in range(page_count):
-            text += doc[i].get_text("text") + "\n"
-        doc.close()
-    except Exception:
-        text = ""
-    if len(text.strip()) < 50:
-        try:
-            pages = convert_from_path(file_path, last_page=PDF_PAGE_LIMIT)
-            for page_image in pages:
-                text += pytesseract.image_to_string(page_image, lang="fra+ara+eng") + "\n"
-        except Exception as e:
-            print(f"⚠️ OCR failed for {file_path}: {e}")
-    return clean_extracted_text(text)
-
-def extract_text_from_docx(file_path):
-    try:
-        doc = docx.Document(file_path)
-        text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-        return clean_extracted_text(text)
-    except Exception:
-        return ""
+SEARCH_START_DATE = "01/01/2020"
 
-def extract_text_from_doc(file_path):
-    try:
-        process = subprocess.Popen(["antiword", file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, _ = process.communicate()
-        text = stdout.decode("utf-8", errors="ignore")
-        return clean_extracted_text(text)
-    except Exception as e:
-        print(f"⚠️ Antiword failed for {file_path}: {e}")
-        return ""
+# The browser is only started when the HTTP listing fails
+driver = None
 
-def extract_from_zip(file_path):
-    try:
-        extract_to = os.path.splitext(file_path)[0]
-        os.makedirs(extract_to, exist_ok=True)
-        with zipfile.ZipFile(file_path, "r") as zip_ref:
-            zip_ref.extractall(extract_to)
-        return extract_to
-    except Exception as e:
-        print(f"⚠️ Failed to unzip {file_path}: {e}")
-        return None
-
-def clear_download_directory():
-    for item in os.listdir(download_dir):
-        path = os.path.join(download_dir, item)
-        try:
-            if os.path.isfile(path) or os.path.islink(path):
-                os.unlink(path)
-            elif os.path.isdir(path):
-                shutil.rmtree(path)
-        except Exception as e:
-            print(f"⚠️ Failed to delete {path}: {e}")
-
-def wait_for_download_complete(timeout=90):
-    seconds = 0
-    while seconds < timeout:
-        downloading = any(f.endswith(".crdownload") for f in os.listdir(download_dir))
-        if not downloading:
-            files = [f for f in os.listdir(download_dir) if not f.endswith(".crdownload")]
-            if files:
-                return os.path.join(download_dir, files[0])
-        time.sleep(1)
-        seconds += 1
-    return None
+def start_driver():
+    driver = make_driver(download_dir, page_load_timeout=40, profile="main")
+    wait = WebDriverWait(driver, 25)
+    print("✅ WebDriver initialized.")
+    return driver, wait
 
 # -----------------------------
-# MAIN SCRIPT
+# SELENIUM LISTING (FALLBACK)
 # -----------------------------
-data = []
-
-try:
-    print("\n--- Starting scraping ---")
+def scrape_listing_selenium(driver, wait, on_page=None):
+    data = []
     driver.get("https://www.marchespublics.gov.ma/index.php?page=entreprise.EntrepriseAdvancedSearch&searchAnnCons")
     time.sleep(2)
 
@@ -156,7 +46,7 @@ try:
 # Step 3: Set date filter to yesterday
     date_input = driver.find_element(By.ID, "ctl0_CONTENU_PAGE_AdvancedSearch_dateMiseEnLigneCalculeStart")
     date_input1 = driver.find_element(By.ID, "ctl0_CONTENU_PAGE_AdvancedSearch_dateMiseEnLigneStart")
-    yesterday = "01/01/2020"
+    yesterday = SEARCH_START_DATE
     date_input.clear()
     date_input1.clear()
     for char in yesterday:
@@ -174,34 +64,19 @@ try:
 
     # Step 4: Set results per page
     try:
+        before = first_row(driver, ROWS_XPATH)
         Select(driver.find_element(By.ID, "ctl0_CONTENU_PAGE_resultSearch_listePageSizeTop")).select_by_value("500")
-        time.sleep(2)
+        wait_for_table_swap(driver, before, ROWS_XPATH)
     except Exception as e:
         print(f"Could not set page size: {e}")
 
     # Step 5: Scrape table while clicking next
     while True:
         try:
-            rows = driver.find_elements(By.XPATH, '//table[@class="table-results"]/tbody/tr')
-            for row in rows:
-                try:
-                    ref = row.find_element(By.CSS_SELECTOR, '.col-450 .ref').text
-                    objet = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocObjet")]').text.replace("Objet : ", "")
-                    buyer = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocDenomination")]').text.replace("Acheteur public : ", "")
-                    lieux = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocLieuxExec")]').text.replace("\n", ", ")
-                    deadline = row.find_element(By.XPATH, './/td[@headers="cons_dateEnd"]').text.replace("\n", " ")
-                    first_button = row.find_element(By.XPATH, './/td[@class="actions"]//a[1]').get_attribute("href")
-
-                    data.append({
-                        "reference": ref,
-                        "objet": objet,
-                        "acheteur": buyer,
-                        "lieux_execution": lieux,
-                        "date_limite": deadline,
-                        "first_button_url": first_button
-                    })
-                except Exception as e:
-                    print(f"Error extracting row: {e}")
+            page_rows = extract_rows(driver, ROWS_XPATH)
+            data.extend(page_rows)
+            if on_page:
+                on_page(page_rows)
         except Exception as e:
             print(f"Error scraping table: {e}")
 
@@ -210,25 +85,46 @@ try:
             next_btn = wait.until(
                 EC.element_to_be_clickable((By.ID, "ctl0_CONTENU_PAGE_resultSearch_PagerTop_ctl2"))
             )
+            before = first_row(driver, ROWS_XPATH)
             next_btn.click()
-            time.sleep(2)
+            wait_for_table_swap(driver, before, ROWS_XPATH)
         except (TimeoutException, ElementClickInterceptedException, NoSuchElementException):
             print("Next button not clickable or not found, ending loop.")
             break
 
-    # Convert to DataFrame and save
-    df = pd.DataFrame(data)
-    print(f"Scraped {len(df)} rows.")
-    output_file = "marches_publics_services_2020_to_now.xlsx"
-    df.to_excel(output_file, index=False)
-    print(f"✅ Excel saved: {output_file}")
+    print(f"⏱️ Row extraction: {timing_summary()}")
+    return data
+
+# -----------------------------
+# MAIN SCRIPT
+# -----------------------------
+# Rows are written page by page; the Excel file is a copy made at the end
+sink = open_sink("marches_publics_services_2020_to_now")
+
+try:
+    print("\n--- Starting scraping ---")
+    try:
+        data = fetch_listing(SEARCH_START_DATE)
+        print(f"✅ HTTP listing returned {len(data)} rows, no browser needed.")
+        sink.write_many(data)
+    except Exception as e:
+        print(f"⚠️ HTTP listing failed ({e}), falling back to Selenium.")
+        driver, wait = start_driver()
+        scrape_listing_selenium(driver, wait, on_page=sink.write_many)
 
 except Exception as e:
     print("❌ Error during execution:")
     print(e)
 
 finally:
+    sink.close()
+    print(f"Scraped {sink.count} rows into {sink.path}.")
+    if sink.count and EXPORT_EXCEL:
+        output_file = "marches_publics_services_2020_to_now.xlsx"
+        export_excel(sink.path, output_file)
+        print(f"✅ Excel saved: {output_file}")
     try:
-        driver.quit()
+        if driver:
+            driver.quit()
     except:
-        pass
+        pass
\ No newline at end of file
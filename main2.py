@@ -1,29 +1,24 @@
 import os
 import time
-import re
 import shutil
-import zipfile
-import subprocess
 import traceback
-import unicodedata
-import random
 import pandas as pd
-from datetime import datetime, timedelta
-
-# PDF / OCR / DOC
-import fitz  # PyMuPDF
-from pdf2image import convert_from_path
-from PIL import Image
-import pytesseract
-import docx
 
 # Selenium
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException
+from selenium.common.exceptions import TimeoutException
+
+from browser import BrowserPool
+from dce_pool import BROWSER_WORKERS, NO_DOCUMENT, iter_tenders
+from extraction import NO_TEXT
+from sinks import EXPORT_EXCEL, export_excel, open_sink
+from listing import ROWS_XPATH, extract_rows, first_row, wait_for_table_swap
+from tender_index import TenderIndex
+from text_store import TextStore
+from search_index import SearchIndex
+from keyword_rules import load_rules
 
 # -----------------------------
 # CONFIGURATION
@@ -32,140 +27,32 @@ print("🚀 Initializing configuration...")
 download_dir = os.path.join(os.getcwd(), "downloads_temp")
 os.makedirs(download_dir, exist_ok=True)
 
-options = webdriver.ChromeOptions()
-options.add_argument("--headless=chrome")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--window-size=1920,1080")
-options.add_argument("--disable-gpu")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_experimental_option("excludeSwitches", ["enable-automation"])
-options.add_experimental_option("useAutomationExtension", False)
-
-# ✅ CRITICAL FIX: Add User-Agent to look like a real browser
-options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-prefs = {
-    "download.default_directory": download_dir,
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-}
-options.add_experimental_option("prefs", prefs)
-
-service = Service()
-driver = webdriver.Chrome(service=service, options=options)
+# The listing browser goes back to the pool for the DCE downloads (dce_pool.py)
+browsers = BrowserPool(BROWSER_WORKERS, name="main2")
+driver = browsers.acquire(download_dir)
 wait = WebDriverWait(driver, 30) # Increased to 30s
-driver.set_page_load_timeout(60)
 print("✅ WebDriver initialized.")
 
-PDF_PAGE_LIMIT = 10
-
-# -----------------------------
-# HELPER FUNCTIONS
-# -----------------------------
-def clean_extracted_text(text):
-    text = unicodedata.normalize("NFKC", text)
-    text = re.sub(r"\n{2,}", "\n", text)
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"Page\s*\d+\s*/\s*\d+", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"[\u0000-\u001f]+", "", text)
-    cleaned_lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    pretty = "\n".join(cleaned_lines)
-    pretty = re.sub(r"\n{3,}", "\n\n", pretty)
-    return pretty.strip()
-
-def extract_text_from_pdf(file_path):
-    text = ""
-    try:
-        doc = fitz.open(file_path)
-        page_count = min(len(doc), PDF_PAGE_LIMIT)
-        for i in range(page_count):
-            text += doc[i].get_text("text") + "\n"
-        doc.close()
-    except Exception:
-        text = ""
-    if len(text.strip()) < 50:
-        try:
-            pages = convert_from_path(file_path, last_page=PDF_PAGE_LIMIT)
-            for page_image in pages:
-                text += pytesseract.image_to_string(page_image, lang="fra+ara+eng") + "\n"
-        except Exception as e:
-            print(f"⚠️ OCR failed for {file_path}: {e}")
-    return clean_extracted_text(text)
-
-def extract_text_from_docx(file_path):
-    try:
-        doc = docx.Document(file_path)
-        text = "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-        return clean_extracted_text(text)
-    except Exception:
-        return ""
-
-def extract_text_from_doc(file_path):
-    try:
-        process = subprocess.Popen(["antiword", file_path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, _ = process.communicate()
-        text = stdout.decode("utf-8", errors="ignore")
-        return clean_extracted_text(text)
-    except Exception as e:
-        print(f"⚠️ Antiword failed for {file_path}: {e}")
-        return ""
-
-def extract_from_zip(file_path):
-    try:
-        extract_to = os.path.splitext(file_path)[0]
-        os.makedirs(extract_to, exist_ok=True)
-        with zipfile.ZipFile(file_path, "r") as zip_ref:
-            zip_ref.extractall(extract_to)
-        return extract_to
-    except Exception as e:
-        print(f"⚠️ Failed to unzip {file_path}: {e}")
-        return None
-
-def clear_download_directory():
-    for item in os.listdir(download_dir):
-        path = os.path.join(download_dir, item)
-        try:
-            if os.path.isfile(path) or os.path.islink(path):
-                os.unlink(path)
-            elif os.path.isdir(path):
-                shutil.rmtree(path)
-        except Exception as e:
-            print(f"⚠️ Failed to delete {path}: {e}")
-
-def wait_for_download_complete(timeout=120):
-    elapsed = 0
-    stable_count = 0
-    last_size = -1
-
-    while elapsed < timeout:
-        files = [f for f in os.listdir(download_dir) 
-                 if not f.endswith(".crdownload") and not f.startswith(".com.google.Chrome.")]
-        if files:
-            file_path = os.path.join(download_dir, files[0])
-            size = os.path.getsize(file_path)
-            if size == last_size:
-                stable_count += 1
-            else:
-                stable_count = 0
-                last_size = size
-
-            if stable_count >= 3:
-                return file_path
-        else:
-            last_size = -1
-            stable_count = 0
+SEARCH_START_DATE = "01/01/2020"
 
-        time.sleep(1)
-        elapsed += 1
+# Include/exclude terms for the listing objects and the DCE texts (keyword_rules.json)
+listing_rules = load_rules("listing")
+document_rules = load_rules("documents")
 
-    print("⚠️ Timeout waiting for download to finish.")
-    return None
+# Tenders already extracted by earlier runs are skipped
+tender_index = TenderIndex("main2")
+# Full DCE texts live here; the output rows only carry their hash and length
+text_store = TextStore()
+# ... and are searchable with search_index.py
+search_index = SearchIndex()
 
 # -----------------------------
 # MAIN SCRIPT
 # -----------------------------
-all_processed_tenders = []
+# Processed tenders go to disk batch by batch as they finish
+sink = open_sink("marches_publics_extracted")
+# Downloaded tenders whose sink batch is not on disk yet, marked in the index after it is
+unsaved = []
 
 try:
     print("\n--- Starting scraping ---")
@@ -202,7 +89,8 @@ try:
     time.sleep(1)
 
     # Step 3: Date and Keyword
-    yesterday = "01/01/2020"
+    yesterday = tender_index.search_start_date(SEARCH_START_DATE)
+    print(f"ℹ️ Searching tenders published since {yesterday}")
     
     # Try both potential date inputs
     try:
@@ -238,41 +126,22 @@ try:
     # Step 4: Set results per page
     try:
         wait.until(EC.presence_of_element_located((By.ID, "ctl0_CONTENU_PAGE_resultSearch_listePageSizeTop")))
+        before = first_row(driver, ROWS_XPATH)
         Select(driver.find_element(By.ID, "ctl0_CONTENU_PAGE_resultSearch_listePageSizeTop")).select_by_value("500")
-        time.sleep(3)
+        wait_for_table_swap(driver, before, ROWS_XPATH)
     except TimeoutException:
         print("ℹ️ No results table found or no pagination options (possibly 0 results).")
 
     # Step 5: Scrape table
-    rows = driver.find_elements(By.XPATH, '//table[@class="table-results"]/tbody/tr')
-    print(f"✅ Found {len(rows)} rows.")
-    
-    data = []
-    for row in rows:
-        try:
-            ref = row.find_element(By.CSS_SELECTOR, '.col-450 .ref').text
-            objet = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocObjet")]').text.replace("Objet : ", "")
-            buyer = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocDenomination")]').text.replace("Acheteur public : ", "")
-            lieux = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocLieuxExec")]').text.replace("\n", ", ")
-            deadline = row.find_element(By.XPATH, './/td[@headers="cons_dateEnd"]').text.replace("\n", " ")
-            first_button = row.find_element(By.XPATH, './/td[@class="actions"]//a[1]').get_attribute("href")
-            data.append({
-                "reference": ref,
-                "objet": objet,
-                "acheteur": buyer,
-                "lieux_execution": lieux,
-                "date_limite": deadline,
-                "first_button_url": first_button
-            })
-        except Exception as e:
-            print(f"⚠️ Error extracting row: {e}")
+    data = extract_rows(driver, ROWS_XPATH)
+    print(f"✅ Found {len(data)} rows.")
 
     df = pd.DataFrame(data)
     
     if not df.empty:
-        excluded_words = ["construction", "installation", "travaux", "fourniture", "achat", "equipement", "supply", "acquisition", "nettoyage"]
-        df = df[~df['objet'].str.lower().str.contains('|'.join(excluded_words), na=False)]
+        df = listing_rules.filter(df)
         print(f"✅ {len(df)} valid tenders after filtering.\n")
+        pending = tender_index.pending(df.to_dict("records"))
 
         # Step 6: Download loop
         fields = {
@@ -281,141 +150,58 @@ try:
             "ctl0_CONTENU_PAGE_EntrepriseFormulaireDemande_email": "anas.lachhab@example.com"
         }
 
-        for idx, row in df.iterrows():
-            link = row['first_button_url']
-            print(f"\n🔗 Processing tender {idx+1}/{len(df)}: {link}")
-
-            try:
-                driver.get(link)
-            except TimeoutException:
-                print(f"⚠️ Timeout loading {link}, retrying...")
-                try:
-                    driver.execute_script("window.stop();")
-                    driver.execute_script("window.location.href = arguments[0];", link)
-                except TimeoutException:
-                    print(f"❌ Still timed out, skipping this tender.")
-                    continue
-
-            time.sleep(3)
-            merged_text = "No document downloaded"
-
-            try:
-                download_link = wait.until(EC.element_to_be_clickable((By.ID, "ctl0_CONTENU_PAGE_linkDownloadDce")))
-                driver.execute_script("arguments[0].scrollIntoView(true);", download_link)
-                download_link.click()
-
-                # Fill form
-                for fid, value in fields.items():
-                    try:
-                        inp = wait.until(EC.presence_of_element_located((By.ID, fid)))
-                        inp.clear()
-                        inp.send_keys(value)
-                    except:
-                        pass # Sometimes fields are pre-filled
-
-                # Accept terms
-                try:
-                    checkbox = driver.find_element(By.ID, "ctl0_CONTENU_PAGE_EntrepriseFormulaireDemande_accepterConditions")
-                    if not checkbox.is_selected():
-                        checkbox.click()
-                except:
-                    pass
-
-                valider_button = wait.until(EC.element_to_be_clickable((By.ID, "ctl0_CONTENU_PAGE_validateButton")))
-                driver.execute_script("arguments[0].scrollIntoView({block:'center'});", valider_button)
-                time.sleep(0.5)
-                try:
-                    valider_button.click()
-                except ElementClickInterceptedException:
-                    driver.execute_script("arguments[0].click();", valider_button)
-
-                final_button = wait.until(EC.element_to_be_clickable((By.ID, "ctl0_CONTENU_PAGE_EntrepriseDownloadDce_completeDownload")))
-                driver.execute_script("arguments[0].scrollIntoView(true);", final_button)
-                final_button.click()
-                print("✅ Download started.")
-
-                downloaded_file = wait_for_download_complete()
-                if downloaded_file:
-                    file_paths = []
-                    if downloaded_file.lower().endswith(".zip"):
-                        unzip_dir = extract_from_zip(downloaded_file)
-                        if unzip_dir:
-                            for r, _, files in os.walk(unzip_dir):
-                                for f in files:
-                                    file_paths.append(os.path.join(r, f))
-                    else:
-                        file_paths.append(downloaded_file)
-
-                    texts = []
-                    for fpath in file_paths:
-                        fname = os.path.basename(fpath)
-                        ext = os.path.splitext(fname)[1].lower()
-                        text = ""
-                    
-                        if "cps" in fname.lower():
-                            print(f"SKIPPED CPS: {fname}")
-                            continue
-                    
-                        if ext == ".pdf":
-                            text = extract_text_from_pdf(fpath)
-                        elif ext == ".docx":
-                            text = extract_text_from_docx(fpath)
-                        elif ext == ".doc":
-                            text = extract_text_from_doc(fpath)
-                        else:
-                            print(f"SKIPPED UNSUPPORTED: {fname}")
-                            continue
-                    
-                        print(f"EXTRACTED {len(text)} chars from {fname}")
-                    
-                        if text.strip():
-                            texts.append(text)
-                    
-                    merged_text = "\n\n".join(texts) or "No relevant text extracted"
-                else:
-                    print("⚠️ Download failed or timed out.")
-
-            except Exception as e:
-                print(f"⚠️ Error processing tender {link}: {e}")
-                # traceback.print_exc()
-
-            # Add data to result list
-            tender_payload = row.to_dict()
-            tender_payload["merged_text"] = merged_text
-            all_processed_tenders.append(tender_payload)
-            
-            clear_download_directory()
-            time.sleep(random.uniform(2, 4))
+        # Parallel browsers download, a process pool extracts
+        # The session now belongs to the pool: no more screenshots from it
+        browsers.release(driver)
+        driver = None
+        for tender in iter_tenders(enumerate(pending), fields, download_dir, browsers=browsers):
+            # Failed downloads stay pending for the next run
+            if tender["merged_text"] != NO_DOCUMENT:
+                unsaved.append(tender)
+            text = tender.pop("merged_text")
+            if text in (NO_DOCUMENT, NO_TEXT):
+                # Placeholders are not DCE text: nothing to store, index or match
+                tender.update(document_relevant=None, document_keywords="", text_hash=None, text_length=None)
+            else:
+                relevant, keywords = document_rules.check(text)
+                tender["document_relevant"] = relevant
+                tender["document_keywords"] = "; ".join(keywords)
+                tender.update(text_store.put(tender["reference"], tender["first_button_url"], text))
+                search_index.add(tender, text)
+            sink.write(tender)
+            if not sink.buffer:
+                tender_index.mark_processed(unsaved)
+                unsaved = []
     else:
         print("⚠️ No data found in the initial table.")
+    tender_index.finish_run()
 
 except Exception as e:
     print(f"❌ FATAL ERROR: {e}")
     traceback.print_exc()
-    driver.save_screenshot("error_page_fatal.png")
+    # Only while the listing still holds its session
+    if driver:
+        driver.save_screenshot("error_page_fatal.png")
 
 finally:
-    if all_processed_tenders:
-        # Create Excel File
-        output_filename = "marches_publics_extracted.xlsx"
-        df_out = pd.DataFrame(all_processed_tenders)
-        
-        # Save to Excel
-        output_path = os.path.join(os.getcwd(), output_filename)
-        try:
-            df_out.to_excel(output_path, index=False, engine='openpyxl')
-            print(f"✅ Excel saved: {output_path} ({len(df_out)} rows)")
-        except Exception as e:
-            print(f"❌ Failed to save Excel: {e}")
-            df_out.to_csv("backup_results.csv", index=False)
-            
+    sink.close()
+    tender_index.mark_processed(unsaved)
+    if sink.count:
+        print(f"✅ {sink.count} tenders saved: {sink.path}")
+        if EXPORT_EXCEL:
+            output_path = os.path.join(os.getcwd(), "marches_publics_extracted.xlsx")
+            try:
+                export_excel(sink.path, output_path)
+                print(f"✅ Excel saved: {output_path}")
+            except Exception as e:
+                print(f"❌ Failed to save Excel: {e}")
     else:
         print("ℹ️ No tenders processed.")
 
-    try:
-        driver.quit()
-    except Exception:
-        pass
+    tender_index.close()
+    text_store.close()
+    search_index.close()
+    browsers.close()
     if os.path.exists(download_dir):
         shutil.rmtree(download_dir, ignore_errors=True)
 
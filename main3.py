@@ -6,21 +6,25 @@ import traceback
 import unicodedata
 import random
 import pandas as pd
-from datetime import datetime
 
 # Selenium Imports
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import (
     TimeoutException, 
     NoSuchElementException, 
-    StaleElementReferenceException,
     ElementNotInteractableException # Added for potential Next button issues
 )
 
+from browser import make_driver
+
+# Plain HTTP listing engine, Selenium is only the fallback
+from listing_http import fetch_listing
+from listing import DATA_ROWS_XPATH, extract_rows, first_row, timing_summary, wait_for_table_swap
+from tender_index import TenderIndex
+from sinks import EXPORT_EXCEL, export_excel, open_sink
+
 # -----------------------------
 # CONFIGURATION
 # -----------------------------
@@ -30,31 +34,19 @@ print("🚀 [INIT] Initializing configuration...")
 download_dir = os.path.join(os.getcwd(), "downloads_temp")
 os.makedirs(download_dir, exist_ok=True)
 
-# Chrome Options
-options = webdriver.ChromeOptions()
-options.add_argument("--headless=new") 
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--window-size=1920,1080")
-options.add_argument("--disable-gpu")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_experimental_option("excludeSwitches", ["enable-automation"])
-options.add_experimental_option("useAutomationExtension", False)
-options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-prefs = {
-    "download.default_directory": download_dir,
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-}
-options.add_experimental_option("prefs", prefs)
-
-# Initialize Driver
-service = Service()
-driver = webdriver.Chrome(service=service, options=options)
-wait = WebDriverWait(driver, 20)
-driver.set_page_load_timeout(60)
-print("✅ [INIT] WebDriver initialized.")
+SEARCH_START_DATE = "01/01/2020" # Using a fixed date for broader results
+
+# Only tenders new or modified since the last run are written out
+tender_index = TenderIndex("main3")
+
+# The browser is only started when the HTTP listing fails
+driver = None
+
+def start_driver():
+    driver = make_driver(download_dir, page_load_timeout=60, profile="main3")
+    wait = WebDriverWait(driver, 20)
+    print("✅ [INIT] WebDriver initialized.")
+    return driver, wait
 
 # -----------------------------
 # HELPER FUNCTIONS
@@ -73,13 +65,12 @@ def clear_download_directory():
                 print(f"⚠️ Failed to delete {file_path}. Reason: {e}")
 
 # -----------------------------
-# MAIN SCRIPT
+# SELENIUM LISTING (FALLBACK)
 # -----------------------------
-all_processed_tenders = [] # List to store final data
-metadata_list = [] # List to store initial data
-current_page_number = 1 # Added for pagination tracking
+def scrape_listing_selenium(driver, wait, start_date, on_page=None):
+    metadata_list = []
+    current_page_number = 1 # Added for pagination tracking
 
-try:
     print("\n--- [STEP 1] Starting Navigation ---")
     url = "https://www.marchespublics.gov.ma/index.php?page=entreprise.EntrepriseAdvancedSearch&searchAnnCons"
     driver.get(url)
@@ -119,7 +110,7 @@ try:
 
     # --- [STEP 3] Fill Search Form ---
     print("--- [STEP 3] Filling Search Form ---")
-    yesterday = "01/01/2020" # Using a fixed date for broader results
+    yesterday = start_date
     
     # Fill Date
     try:
@@ -160,9 +151,10 @@ try:
         print("--- [STEP 4] Adjusting Page Size ---")
         # Ensure the table and page size dropdown are present before interacting
         wait.until(EC.presence_of_element_located((By.ID, "ctl0_CONTENU_PAGE_resultSearch_listePageSizeTop")))
+        before = first_row(driver, DATA_ROWS_XPATH)
         Select(driver.find_element(By.ID, "ctl0_CONTENU_PAGE_resultSearch_listePageSizeTop")).select_by_value("500")
         print("ℹ️ Page size set to 500.")
-        time.sleep(7) # Increased sleep after changing page size, as it triggers a reload
+        wait_for_table_swap(driver, before, DATA_ROWS_XPATH) # Changing page size triggers a reload
     except TimeoutException:
         print("ℹ️ No results table or page size dropdown found (possibly 0 results).")
     except NoSuchElementException:
@@ -176,40 +168,19 @@ try:
         try:
             # Wait for the table rows to be present on the page
             # This helps against StaleElementReferenceException if the page reloads
-            wait.until(EC.presence_of_all_elements_located((By.XPATH, '//table[@class="table-results"]/tbody/tr[not(contains(@class, "table-header"))]')))
+            wait.until(EC.presence_of_all_elements_located((By.XPATH, DATA_ROWS_XPATH)))
             
-            rows = driver.find_elements(By.XPATH, '//table[@class="table-results"]/tbody/tr[not(contains(@class, "table-header"))]')
+            # All rows of the page come back from a single WebDriver call
+            page_rows = extract_rows(driver, DATA_ROWS_XPATH)
             
-            if not rows:
+            if not page_rows:
                 print(f"📄 No tender rows found on page {current_page_number}. Ending pagination.")
                 break # Exit if no rows are found, likely end of results
             
-            print(f"📄 Found {len(rows)} rows on Page {current_page_number}.")
-
-            for row in rows:
-                try:
-                    ref = row.find_element(By.CSS_SELECTOR, '.col-450 .ref').text
-                    
-                    objet = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocObjet")]').text.replace("Objet : ", "")
-                    buyer = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocDenomination")]').text.replace("Acheteur public : ", "")
-                    lieux = row.find_element(By.XPATH, './/div[contains(@id,"panelBlocLieuxExec")]').text.replace("\n", ", ")
-                    deadline = row.find_element(By.XPATH, './/td[@headers="cons_dateEnd"]').text.replace("\n", " ")
-                    first_button = row.find_element(By.XPATH, './/td[@class="actions"]//a[1]').get_attribute("href")
-                    
-                    metadata_list.append({
-                        "reference": ref,
-                        "objet": objet,
-                        "acheteur": buyer,
-                        "lieux_execution": lieux,
-                        "date_limite": deadline,
-                        "first_button_url": first_button
-                    })
-                except StaleElementReferenceException:
-                    print("   ⚠️ Stale element encountered, re-locating row for next iteration.")
-                    continue # Skip this row, try next if the element is stale
-                except Exception as e:
-                    print(f"   ⚠️ Error scraping a row on page {current_page_number}: {e}")
-                    continue
+            print(f"📄 Found {len(page_rows)} rows on Page {current_page_number}.")
+            metadata_list.extend(page_rows)
+            if on_page:
+                on_page(page_rows)
             
             print(f"✅ Total tenders collected so far: {len(metadata_list)}")
             
@@ -231,10 +202,10 @@ try:
                     break # Exit loop if button is disabled
                 
                 driver.execute_script("arguments[0].scrollIntoView(true);", next_button)
-                time.sleep(1) # Small pause before clicking
+                before = first_row(driver, DATA_ROWS_XPATH)
                 next_button.click()
                 print(f"➡️ Clicked 'Next' button to go to Page {current_page_number + 1}.")
-                time.sleep(5) # Give page time to load new results
+                wait_for_table_swap(driver, before, DATA_ROWS_XPATH) # Returns as soon as the new rows are in
                 current_page_number += 1
                 
             except (NoSuchElementException, TimeoutException, ElementNotInteractableException):
@@ -249,6 +220,35 @@ try:
             print(traceback.format_exc())
             break # Break on other unexpected errors
 
+    print(f"⏱️ Row extraction: {timing_summary()}")
+    return metadata_list
+
+# -----------------------------
+# MAIN SCRIPT
+# -----------------------------
+metadata_list = [] # List to store initial data
+# Final data: new or modified listing rows, written as each page comes in
+sink = open_sink("marches_publics_companys_all_pages")
+new_rows = []
+
+def save_new_rows(rows):
+    rows = tender_index.pending(rows)
+    sink.write_many(rows)
+    new_rows.extend(rows)
+
+try:
+    print("\n--- [STEP 1-5] Fetching listing over HTTP ---")
+    start_date = tender_index.search_start_date(SEARCH_START_DATE)
+    print(f"ℹ️ Listing tenders published since {start_date}")
+    try:
+        metadata_list = fetch_listing(start_date, category="Services")
+        print(f"✅ HTTP listing returned {len(metadata_list)} rows, no browser needed.")
+        save_new_rows(metadata_list)
+    except Exception as e:
+        print(f"⚠️ HTTP listing failed ({e}), falling back to Selenium.")
+        driver, wait = start_driver()
+        metadata_list = scrape_listing_selenium(driver, wait, start_date, on_page=save_new_rows)
+
     print(f"✅ Total unique tenders collected after pagination: {len(metadata_list)}")
 
     # -----------------------------
@@ -268,16 +268,15 @@ try:
     # --- [STEP 6] Process Each Tender Link (SKIPPED) ---
     print("\n--- [STEP 6] Skipping Deep Scraping (User Request) ---")
     
-    # We transfer the metadata list directly to the final list
-    # so that Step 7 saves the data we have already found.
-    all_processed_tenders = metadata_list 
+    # The listing rows are the final data, already in the sink
 
     # (Your commented-out deep scraping code remains here)
 
 except Exception as e:
     print("\n❌ [FATAL ERROR] Script crashed.")
     print(traceback.format_exc())
-    driver.save_screenshot("fatal_crash.png")
+    if driver:
+        driver.save_screenshot("fatal_crash.png")
 
 finally:
     # -----------------------------
@@ -285,30 +284,31 @@ finally:
     # -----------------------------
     print("\n--- [STEP 7] Saving Final Data ---")
     
-    if all_processed_tenders:
-        # Create a unique filename with timestamp
-        excel_filename = f"marches_publics_companys_all_pages.xlsx" # Changed filename
-        
-        df_out = pd.DataFrame(all_processed_tenders)
-        
-        try:
-            # Save to Excel
-            df_out.to_excel(excel_filename, index=False, engine='openpyxl')
-            print(f"✅ SUCCESS! Data saved to: {excel_filename}")
-            print(f"📊 Total Rows: {len(df_out)}")
-        except Exception as e:
-            print(f"❌ Failed to save Excel (Reason: {e})")
-            # Fallback to CSV
-            csv_filename = f"marches_publics_backup_all_pages_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            df_out.to_csv(csv_filename, index=False, encoding='utf-8-sig')
-            print(f"✅ Saved as CSV instead: {csv_filename}")
+    sink.close()
+    if sink.count:
+        print(f"✅ SUCCESS! Data saved to: {sink.path}")
+        print(f"📊 Total Rows: {sink.count}")
+        if EXPORT_EXCEL:
+            excel_filename = "marches_publics_companys_all_pages.xlsx"
+            try:
+                export_excel(sink.path, excel_filename)
+                print(f"✅ Excel copy saved: {excel_filename}")
+            except Exception as e:
+                print(f"❌ Failed to save Excel (Reason: {e})")
     else:
         print("⚠️ No data was collected, so no file was saved.")
 
+    if new_rows:
+        tender_index.mark_processed(new_rows)
+    if metadata_list:
+        tender_index.finish_run()
+    tender_index.close()
+
     # Close Browser
     try:
-        driver.quit()
-        print("👋 Browser closed.")
+        if driver:
+            driver.quit()
+            print("👋 Browser closed.")
     except:
         pass
 
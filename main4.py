@@ -1,8 +1,12 @@
 import os
+import glob
+import json
 import time
+import argparse
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+
+from http_client import HostRateLimiter, SessionMetrics, fetch_all, make_session
+from pv_parser import bidders_from_text, parse_results
 
 # -----------------------------
 # CONFIGURATION
@@ -11,6 +15,22 @@ EXCEL_FILE = "URLS.xlsx"
 URL_COLUMN = "PV"
 RESULT_COLUMN = "Entreprise"
 
+# Append-only results journals: one JSON line per processed URL.
+# The workbook is only rewritten once, by the merge step.
+JOURNAL_FILE = "URLS.journal.jsonl"
+SHARD_JOURNAL_FILE = "URLS.journal.shard-{}-of-{}.jsonl"
+JOURNAL_GLOB = "URLS.journal*.jsonl"
+
+# Long-format bidder table (one row per bidder per PV), rebuilt on merge
+BIDDERS_FILE = "URLS.bidders.parquet"
+
+# Stop fetching before the workflow timeout so the final merge always runs
+RUN_BUDGET_SECONDS = int(os.environ.get("RUN_BUDGET_SECONDS", 50 * 60))
+
+# Concurrent fetching, throttled per host instead of a fixed sleep
+CONCURRENCY = int(os.environ.get("CONCURRENCY", 8))
+REQUESTS_PER_SECOND = float(os.environ.get("REQUESTS_PER_SECOND", 4))
+
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -19,55 +39,195 @@ HEADERS = {
     )
 }
 
-print("🚀 Starting scraping (bs4, no batches)")
+def parse_shard(value):
+    """Parses "i/N" (1-based) into (i, N)."""
+    try:
+        shard, total = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if not 1 <= shard <= total:
+        raise argparse.ArgumentTypeError(f"shard must be between 1 and {total}, got {shard}")
+    return shard, total
+
+parser = argparse.ArgumentParser(description="Scrape PV company names into URLS.xlsx")
+parser.add_argument("--shard", type=parse_shard, default=(1, 1), metavar="i/N",
+                    help="only process pending rows of shard i out of N (default 1/1)")
+parser.add_argument("--merge", action="store_true",
+                    help="merge every journal into the workbook and exit")
+args = parser.parse_args()
+SHARD, SHARD_COUNT = args.shard
+
+# One pooled keep-alive session shared by all workers, retrying transient errors
+metrics = SessionMetrics()
+session = make_session(HEADERS, pool_size=CONCURRENCY, metrics=metrics)
 
 # -----------------------------
-# LOAD EXCEL
+# JOURNAL HELPERS
 # -----------------------------
-df = pd.read_excel(EXCEL_FILE)
-df = df.reset_index(drop=True)
-
-if RESULT_COLUMN not in df.columns:
-    df[RESULT_COLUMN] = None
+def load_journal(path, entries=None):
+    """Adds {row index: entry} for every complete line of the journal to entries."""
+    entries = {} if entries is None else entries
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a killed run
+            previous = entries.get(entry["index"])
+            if previous and entry.get("error") and not previous.get("error"):
+                continue  # a success recorded by another shard wins over a failure
+            entries[entry["index"]] = entry
+    return entries
+
+def load_journals(pattern):
+    entries = {}
+    for path in sorted(glob.glob(pattern)):
+        load_journal(path, entries)
+    return entries
+
+def append_journal(journal, index, url, result, bidders=None, error=None):
+    entry = {"index": index, "url": url, "result": result}
+    if bidders is not None:
+        entry["bidders"] = bidders
+    if error:
+        entry["error"] = error
+    journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+    return entry
+
+def compact_journals(entries):
+    """Rewrites all journals as a single JOURNAL_FILE and removes shard journals."""
+    tmp_path = JOURNAL_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for index in sorted(entries):
+            f.write(json.dumps(entries[index], ensure_ascii=False) + "\n")
+    os.replace(tmp_path, JOURNAL_FILE)
+    for path in glob.glob(JOURNAL_GLOB):
+        if os.path.abspath(path) != os.path.abspath(JOURNAL_FILE):
+            os.remove(path)
+
+def apply_journal(df, entries):
+    """Copies journaled results into df. Returns the set of finished row indexes."""
+    done = set()
+    for index, entry in entries.items():
+        if index >= len(df) or df.at[index, URL_COLUMN] != entry["url"]:
+            continue  # workbook changed since this entry was written
+        if entry.get("error"):
+            continue  # transient failure, retry it
+        df.at[index, RESULT_COLUMN] = entry["result"]
+        done.add(index)
+    return done
+
+def write_bidders(df, entries, path):
+    """Writes the long-format bidder table for every finished row of df.
+
+    Rows scraped before structured parsing existed fall back to splitting
+    their flattened Entreprise text.
+    """
+    records = []
+    for index, url, text in zip(df.index, df[URL_COLUMN], df[RESULT_COLUMN]):
+        entry = entries.get(index)
+        if entry and entry["url"] == url and "bidders" in entry:
+            bidders = entry["bidders"]
+        else:
+            bidders = bidders_from_text(text)
+        for bidder in bidders:
+            records.append({"row_index": index, "reference": df.at[index, "reference"], "url": url, **bidder})
+
+    bidders_df = pd.DataFrame.from_records(
+        records, columns=["row_index", "reference", "url", "table", "position", "company", "amount", "rank", "status"]
+    ).astype({
+        "row_index": "int64", "reference": "string", "url": "string", "table": "string",
+        "position": "int64", "company": "string", "amount": "float64", "rank": "Int64", "status": "string",
+    })
+    bidders_df.to_parquet(path, index=False)
+    return len(bidders_df)
+
+def pending_rows(df, done, shard=1, shard_count=1):
+    """Row indexes with a PV URL and no result yet, assigned to shards by index."""
+    mask = df[URL_COLUMN].notna() & df[RESULT_COLUMN].isna() & ~df.index.isin(list(done))
+    mask &= (df.index % shard_count) == (shard - 1)
+    return df.index[mask].tolist()
 
 # -----------------------------
-# SCRAPING LOOP
+# FETCH + PARSE
 # -----------------------------
-#for index, row in df.head(1000).iterrows():
-for index, row in df.iloc[7415:8415].iterrows():
-
-    if pd.notna(row[RESULT_COLUMN]):
-        continue  # already processed
+def fetch_entreprise(url):
+    response = session.get(url, timeout=15)
+    response.raise_for_status()
 
-    url = row[URL_COLUMN]
-    if pd.isna(url):
-        continue
+    # Only the results tables are parsed, see bench_pv_parse.py
+    return parse_results(response.text)
 
-    try:
-        print(f"[{index + 1}] Fetching: {url}")
-
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.find("table", class_="table-results")
+# -----------------------------
+# LOAD EXCEL
+# -----------------------------
+df = pd.read_excel(EXCEL_FILE)
+df = df.reset_index(drop=True)
 
-        if table:
-            df.at[index, RESULT_COLUMN] = table.get_text(
-                separator=" - ", strip=True
-            )
-        else:
-            df.at[index, RESULT_COLUMN] = None
+if RESULT_COLUMN not in df.columns:
+    df[RESULT_COLUMN] = None
+df[RESULT_COLUMN] = df[RESULT_COLUMN].astype(object)
 
-    except Exception as e:
-        print(f"❌ Failed: {url}")
-        df.at[index, RESULT_COLUMN] = None
+# Resume from the journals of previous (possibly interrupted or sharded) runs
+journal_entries = load_journals(JOURNAL_GLOB)
+done = apply_journal(df, journal_entries)
+print(f"♻️ Resumed {len(done)} results from journals")
 
-    # SAVE AFTER EACH URL (CRASH SAFE)
+if args.merge:
     df.to_excel(EXCEL_FILE, index=False)
+    compact_journals(journal_entries)
+    print(f"📦 Merged {len(done)} journaled results into {EXCEL_FILE}")
+    print(f"🧾 {write_bidders(df, journal_entries, BIDDERS_FILE)} bidder rows saved to {BIDDERS_FILE}")
+    print(f"⏳ {len(pending_rows(df, done))} rows still pending")
+    raise SystemExit(0)
 
-    # polite delay
-    time.sleep(0.5)
-
-print("✅ Scraping finished")
-print(f"📦 Results saved to {EXCEL_FILE}")
+# -----------------------------
+# SCRAPING LOOP
+# -----------------------------
+pending = pending_rows(df, done, SHARD, SHARD_COUNT)
+if SHARD_COUNT == 1:
+    journal_path = JOURNAL_FILE
+else:
+    journal_path = SHARD_JOURNAL_FILE.format(SHARD, SHARD_COUNT)
+
+print(f"🚀 Starting scraping shard {SHARD}/{SHARD_COUNT}: {len(pending)} pending rows "
+      f"({CONCURRENCY} workers, {REQUESTS_PER_SECOND:g} req/s)")
+
+started = time.monotonic()
+processed = 0
+limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+jobs = ((index, df.at[index, URL_COLUMN]) for index in pending)
+
+try:
+    with open(journal_path, "a", encoding="utf-8") as journal:
+        for index, url, result, error in fetch_all(jobs, fetch_entreprise, CONCURRENCY, limiter):
+            if error is None:
+                text, bidders = result
+                print(f"[{index + 1}] Fetched: {url} ({len(bidders)} bidders)")
+                df.at[index, RESULT_COLUMN] = text
+                journal_entries[index] = append_journal(journal, index, url, text, bidders)
+            else:
+                print(f"❌ Failed: {url}")
+                append_journal(journal, index, url, None, error=str(error) or type(error).__name__)
+
+            processed += 1
+
+            if time.monotonic() - started > RUN_BUDGET_SECONDS:
+                print("⏱️ Run budget reached, stopping early.")
+                break
+
+finally:
+    # Unsharded runs merge straight away; shard runs leave that to --merge
+    if SHARD_COUNT == 1:
+        df.to_excel(EXCEL_FILE, index=False)
+        print(f"📦 Results saved to {EXCEL_FILE}")
+        print(f"🧾 {write_bidders(df, journal_entries, BIDDERS_FILE)} bidder rows saved to {BIDDERS_FILE}")
+    else:
+        print(f"📦 Results journaled to {journal_path}")
+    print("✅ Scraping finished")
+    print(f"📊 {processed}/{len(pending)} URLs processed this run")
+    print(f"📡 HTTP stats: {metrics.snapshot(session)}")
@@ -0,0 +1,89 @@
+import os
+import time
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import fitz  # PyMuPDF
+from PIL import Image
+import pytesseract
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+# One tesseract thread per page: the pool provides the parallelism
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+OCR_LANG = "fra+ara+eng"
+OCR_DPI = int(os.environ.get("OCR_DPI", 200))
+OCR_GRAYSCALE = os.environ.get("OCR_GRAYSCALE", "1") != "0"
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 2))
+# Seconds allowed for all OCR of one document
+OCR_TIME_BUDGET = float(os.environ.get("OCR_TIME_BUDGET", 180))
+
+# -----------------------------
+# PAGE-LEVEL OCR
+# -----------------------------
+def render_page(source, page_number, dpi, grayscale):
+    """Renders one 1-based page of a PDF (path or bytes) straight to a PIL image."""
+    doc = fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+    with doc:
+        colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+        pix = doc[page_number - 1].get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+    mode = "L" if grayscale else "RGB"
+    return Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+
+def ocr_page(source, page_number, dpi, grayscale, deadline):
+    """Renders and OCRs one 1-based page. Returns None if the deadline passed."""
+    if deadline - time.time() <= 0:
+        return None
+    image = render_page(source, page_number, dpi, grayscale)
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        return None
+    return pytesseract.image_to_string(image, lang=OCR_LANG, timeout=remaining)
+
+def ocr_pdf(source, page_numbers, dpi=OCR_DPI, grayscale=OCR_GRAYSCALE, budget=OCR_TIME_BUDGET, name=None):
+    """OCRs the given 1-based pages of a PDF (path or bytes) concurrently and
+    returns {page number: text}.
+
+    Pages that fail, or are not finished within `budget` seconds, are left out.
+    """
+    name = os.path.basename(name or (source if isinstance(source, str) else "PDF"))
+    if isinstance(source, bytes):
+        # Workers get a path: bytes would be pickled to them once per page
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            tmp.write(source)
+            tmp.flush()
+            return ocr_pdf(tmp.name, page_numbers, dpi, grayscale, budget, name)
+
+    started = time.monotonic()
+    deadline = time.time() + budget
+    texts = {}
+    # One pool per document, shut down before returning: a pool left alive
+    # in a forked extraction worker keeps that worker from ever exiting.
+    # Pages still running at the deadline stop at their tesseract timeout.
+    workers = max(1, min(OCR_WORKERS, len(page_numbers)))
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        futures = {pool.submit(ocr_page, source, n, dpi, grayscale, deadline): n for n in page_numbers}
+
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"⚠️ OCR failed for page {futures[future]} of {name}: {e}")
+                    continue
+                if text is not None:
+                    texts[futures[future]] = text
+
+        pool.shutdown(wait=True, cancel_futures=True)
+    skipped = len(futures) - len(texts)
+    print(f"🔎 OCR {len(texts)}/{len(futures)} pages of {name} "
+          f"in {time.monotonic() - started:.1f}s" + (f" ({skipped} skipped)" if skipped else ""))
+    return texts
@@ -0,0 +1,192 @@
+import re
+
+import lxml.html
+from lxml import etree
+
+# -----------------------------
+# RESULTS TABLE EXTRACTION
+# -----------------------------
+# Opening tag of the first <table> whose class list contains "table-results"
+RESULTS_TABLE_RE = re.compile(
+    r"""<table\b[^>]*?\bclass\s*=\s*(["'])(?:(?!\1).)*?(?<![\w-])table-results(?![\w-])""",
+    re.IGNORECASE | re.DOTALL,
+)
+TABLE_TAG_RE = re.compile(r"<(/?)table\b", re.IGNORECASE)
+
+
+def slice_results_tables(html):
+    """Yields the raw markup of every table.table-results, in page order.
+
+    Only the tables are cut out of the page, by counting nested <table> tags,
+    so the rest of the document is never parsed.
+    """
+    pos = 0
+    while True:
+        match = RESULTS_TABLE_RE.search(html, pos)
+        if not match:
+            return
+        start = match.start()
+        depth = 0
+        for tag in TABLE_TAG_RE.finditer(html, start):
+            depth += -1 if tag.group(1) else 1
+            if depth == 0:
+                pos = html.index(">", tag.end()) + 1
+                yield html[start:pos]
+                break
+        else:
+            yield html[start:]  # unclosed table, let the parser repair it
+            return
+
+
+def slice_results_table(html):
+    """Returns the raw markup of the first table.table-results, or None."""
+    return next(slice_results_tables(html), None)
+
+
+def parse_fragment(fragment):
+    table = lxml.html.fragment_fromstring(fragment)
+    etree.strip_elements(table, etree.Comment, "script", "style", with_tail=False)
+    return table
+
+
+def parse_results_table(html):
+    """Parses the first results table into an lxml element, or returns None."""
+    fragment = slice_results_table(html)
+    return None if fragment is None else parse_fragment(fragment)
+
+
+def element_text(element, separator=" - "):
+    """Same output as BeautifulSoup's get_text(separator=..., strip=True)."""
+    return separator.join(s for s in (t.strip() for t in element.itertext()) if s)
+
+
+def extract_results_text(html, separator=" - "):
+    """Text of the first table.table-results joined with separator, or None."""
+    table = parse_results_table(html)
+    if table is None:
+        return None
+    return element_text(table, separator)
+
+# -----------------------------
+# STRUCTURED BIDDER ROWS
+# -----------------------------
+# Tables listing bidders, as opposed to e.g. "Liste des supports de publication"
+BIDDERS_TABLE_RE = re.compile(
+    r"entreprise|participant|soumission|concurrent|attributaire|raison sociale|d[ée]nomination", re.IGNORECASE
+)
+
+# Header text -> field, checked in order
+COLUMN_PATTERNS = [
+    ("amount", re.compile(r"montant|offre financi|prix", re.IGNORECASE)),
+    ("rank", re.compile(r"\brang\b|classement", re.IGNORECASE)),
+    ("company", re.compile(r"entreprise|raison sociale|soumissionnaire|concurrent|participant|d[ée]nomination", re.IGNORECASE)),
+    ("status", re.compile(r"statut|r[ée]sultat|d[ée]cision|attribu|retenu|observation", re.IGNORECASE)),
+]
+BIDDER_FIELDS = ("company", "amount", "rank", "status")
+AMOUNT_RE = re.compile(r"-?\d[\d\s\u00a0\u202f.,]*")
+RANK_RE = re.compile(r"\d+")
+LEGACY_PREFIX = "Entreprises participantes - "
+
+
+def parse_amount(text):
+    """Parses "1 234 567,89 DH" or "1.234.567,89" into a float, or None."""
+    match = AMOUNT_RE.search(text or "")
+    if not match:
+        return None
+    number = re.sub(r"[\s\u00a0\u202f]", "", match.group()).rstrip(".,")
+    if "," in number and "." in number:
+        thousands = "." if number.rindex(",") > number.rindex(".") else ","
+        number = number.replace(thousands, "")
+    if number.count(".") > 1:
+        number = number.replace(".", "")
+    try:
+        return float(number.replace(",", "."))
+    except ValueError:
+        return None
+
+
+def parse_rank(text):
+    match = RANK_RE.search(text or "")
+    return int(match.group()) if match else None
+
+
+def map_columns(headers):
+    """Maps header cell texts to bidder fields, by position."""
+    columns = {}
+    for position, header in enumerate(headers):
+        for field, pattern in COLUMN_PATTERNS:
+            if field not in columns.values() and pattern.search(header):
+                columns[position] = field
+                break
+    if "company" not in columns.values() and 0 not in columns:
+        columns[0] = "company"
+    return columns
+
+
+def parse_bidders_table(table):
+    """Returns (title, bidders) for one parsed results table."""
+    caption = table.find("caption")
+    title = element_text(caption, " ") if caption is not None else ""
+    headers = []
+    bidders = []
+    columns = None
+
+    for row in table.xpath("./tr|./thead/tr|./tbody/tr|./tfoot/tr"):
+        cells = row.xpath("./th|./td")
+        texts = [element_text(cell, " ") for cell in cells]
+        if not any(texts):
+            continue
+        is_header = all(cell.tag == "th" for cell in cells)
+        if columns is None and (is_header or (len(cells) == 1 and BIDDERS_TABLE_RE.search(texts[0]) and not bidders)):
+            if len(cells) == 1:
+                title = title or texts[0]  # a single spanning title cell
+            else:
+                headers = texts
+            continue
+
+        columns = columns or map_columns(headers)
+        bidder = dict.fromkeys(BIDDER_FIELDS)
+        for position, text in enumerate(texts):
+            field = columns.get(position)
+            if field == "amount":
+                bidder["amount"] = parse_amount(text)
+            elif field == "rank":
+                bidder["rank"] = parse_rank(text)
+            elif field and text:
+                bidder[field] = text
+        if bidder["company"]:
+            bidders.append(bidder)
+
+    if not BIDDERS_TABLE_RE.search(" ".join([title] + headers)):
+        return title, []
+    return title, bidders
+
+
+def parse_results(html, separator=" - "):
+    """Returns (text of the first results table or None, bidder rows).
+
+    Bidder rows come from every results table that lists bidders, and carry
+    the table title and their position in it.
+    """
+    text = None
+    bidders = []
+    for fragment in slice_results_tables(html):
+        table = parse_fragment(fragment)
+        if text is None:
+            text = element_text(table, separator)
+        title, rows = parse_bidders_table(table)
+        for position, bidder in enumerate(rows, start=1):
+            bidders.append({"table": title, "position": position, **bidder})
+    return text, bidders
+
+
+def bidders_from_text(text):
+    """Best-effort bidder rows from an old flattened Entreprise cell."""
+    if not isinstance(text, str) or not text.startswith(LEGACY_PREFIX):
+        return []
+    companies = text[len(LEGACY_PREFIX):].split(" - ")
+    return [
+        {"table": "Entreprises participantes", "position": position, "company": company,
+         "amount": None, "rank": None, "status": None}
+        for position, company in enumerate(companies, start=1) if company
+    ]
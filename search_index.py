@@ -0,0 +1,157 @@
+"""Full-text search over the extracted tender documents (SQLite FTS5).
+
+    python search_index.py "intelligence artificielle"      # ranked tenders
+    python search_index.py "objet:audit NOT travaux" -n 50  # FTS5 query syntax
+    python search_index.py --backfill                        # index texts already in the text store
+"""
+import os
+import re
+import time
+import sqlite3
+import argparse
+import unicodedata
+
+from text_store import TEXT_STORE_FILE, TextStore
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+SEARCH_INDEX_FILE = os.environ.get("SEARCH_INDEX_FILE", "tender_search.sqlite")
+
+# Column weights for bm25(): a hit in the object counts most
+RANK = "bm25(docs, 5.0, 1.0, 1.0)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenders (
+    id INTEGER PRIMARY KEY,
+    reference TEXT NOT NULL,
+    url TEXT NOT NULL,
+    objet TEXT,
+    acheteur TEXT,
+    date_limite TEXT,
+    UNIQUE (reference, url)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    objet, acheteur, body,
+    tokenize = "unicode61 remove_diacritics 2"
+);
+"""
+
+# Arabic: diacritics (tashkeel) and tatweel dropped, letter variants folded
+ARABIC_MARKS_RE = re.compile(r"[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+ARABIC_FOLD = str.maketrans({
+    "\u0623": "\u0627", "\u0625": "\u0627", "\u0622": "\u0627", "\u0671": "\u0627",  # alef forms -> ا
+    "\u0649": "\u064a", "\u0626": "\u064a",  # ى ئ -> ي
+    "\u0624": "\u0648",  # ؤ -> و
+    "\u0629": "\u0647",  # ة -> ه
+})
+
+# -----------------------------
+# NORMALISATION
+# -----------------------------
+def normalize(text):
+    """Text as indexed and queried. Case and Latin accents are left to the
+    unicode61 tokenizer; this folds ligatures (NFKC) and Arabic spelling
+    variants it does not know about."""
+    text = unicodedata.normalize("NFKC", text or "")
+    if not text.isascii():
+        text = ARABIC_MARKS_RE.sub("", text).translate(ARABIC_FOLD)
+    return text
+
+def fts_query(query):
+    """`query` as an FTS5 expression. Plain words stay plain; anything FTS5
+    would reject is searched as quoted terms instead."""
+    query = normalize(query)
+    terms = re.findall(r"\w+", query)
+    return query, " ".join(f'"{t}"' for t in terms)
+
+# -----------------------------
+# SEARCH INDEX
+# -----------------------------
+class SearchIndex:
+    def __init__(self, path=SEARCH_INDEX_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, tender, text):
+        """Indexes (or re-indexes) a tender row with its extracted text."""
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT id FROM tenders WHERE reference = ? AND url = ?",
+                (tender["reference"], tender["first_button_url"]),
+            ).fetchone()
+            if row:
+                doc_id = row[0]
+                self.conn.execute(
+                    "UPDATE tenders SET objet = ?, acheteur = ?, date_limite = ? WHERE id = ?",
+                    (tender.get("objet"), tender.get("acheteur"), tender.get("date_limite"), doc_id),
+                )
+                self.conn.execute("DELETE FROM docs WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = self.conn.execute(
+                    "INSERT INTO tenders (reference, url, objet, acheteur, date_limite) VALUES (?, ?, ?, ?, ?)",
+                    (tender["reference"], tender["first_button_url"], tender.get("objet"),
+                     tender.get("acheteur"), tender.get("date_limite")),
+                ).lastrowid
+            self.conn.execute(
+                "INSERT INTO docs (rowid, objet, acheteur, body) VALUES (?, ?, ?, ?)",
+                (doc_id, normalize(tender.get("objet")), normalize(tender.get("acheteur")), normalize(text)),
+            )
+
+    def search(self, query, limit=20):
+        """Best matching tenders, as dicts with a highlighted body snippet."""
+        sql = f"""
+            SELECT t.reference, t.objet, t.acheteur, t.date_limite, t.url,
+                   snippet(docs, 2, '[', ']', ' … ', 12), {RANK} AS rank
+            FROM docs JOIN tenders t ON t.id = docs.rowid
+            WHERE docs MATCH ? ORDER BY rank LIMIT ?
+        """
+        raw, quoted = fts_query(query)
+        try:
+            rows = self.conn.execute(sql, (raw, limit)).fetchall()
+        except sqlite3.OperationalError:
+            if not quoted:
+                return []
+            rows = self.conn.execute(sql, (quoted, limit)).fetchall()
+        keys = ("reference", "objet", "acheteur", "date_limite", "url", "snippet", "rank")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def backfill(self, store_path=TEXT_STORE_FILE):
+        """Indexes the texts of the text store that are not indexed yet.
+        Their object and buyer are unknown until main2.py sees them again."""
+        store = TextStore(store_path)
+        indexed = set(self.conn.execute("SELECT reference, url FROM tenders").fetchall())
+        count = 0
+        for reference, url, digest in store.conn.execute("SELECT reference, url, hash FROM tender_texts"):
+            if (reference, url) in indexed:
+                continue
+            self.add({"reference": reference, "first_button_url": url}, store.get(digest))
+            count += 1
+        store.close()
+        return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query", nargs="?", help="words or an FTS5 query")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="number of tenders to show")
+    parser.add_argument("--backfill", action="store_true", help="index the text store and exit")
+    args = parser.parse_args()
+
+    index = SearchIndex()
+    if args.backfill:
+        print(f"✅ Indexed {index.backfill()} tenders from {TEXT_STORE_FILE}")
+    elif args.query:
+        started = time.perf_counter()
+        results = index.search(args.query, args.limit)
+        elapsed = 1000 * (time.perf_counter() - started)
+        for i, r in enumerate(results, 1):
+            print(f"{i:>3}. {r['reference']}  {r['date_limite'] or ''}\n     {r['objet'] or ''}\n"
+                  f"     {r['acheteur'] or ''}\n     {r['snippet']}\n     {r['url']}")
+        print(f"🔎 {len(results)} tenders in {elapsed:.1f} ms")
+    else:
+        parser.print_help()
+    index.close()
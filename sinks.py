@@ -0,0 +1,160 @@
+import os
+import csv
+import json
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+# "parquet", "csv" or "ndjson"
+SINK_FORMAT = os.environ.get("ROW_SINK_FORMAT", "parquet")
+# Rows buffered before a batch (a Parquet row group) is written
+SINK_BATCH_SIZE = int(os.environ.get("ROW_SINK_BATCH_SIZE", 50))
+# Set to 0 to skip the end-of-run Excel copy of the sink output
+EXPORT_EXCEL = os.environ.get("EXPORT_EXCEL", "1") != "0"
+
+EXTENSIONS = {"parquet": ".parquet", "csv": ".csv", "ndjson": ".ndjson"}
+
+# -----------------------------
+# ROW SINKS
+# -----------------------------
+class RowSink:
+    """Writes dict rows to disk in batches as they are produced.
+
+    Every SINK_BATCH_SIZE rows (and on close) the buffer is written out and
+    flushed, so a crash loses at most one batch and finished rows do not
+    stay in memory.
+    """
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if self.buffer:
+            self.write_batch(self.buffer)
+            self.count += len(self.buffer)
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.close_file()
+
+    def write_batch(self, rows):
+        raise NotImplementedError
+
+    def close_file(self):
+        pass
+
+class CSVSink(RowSink):
+    # Columns are fixed by the first batch; later rows may leave some empty
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.file = None
+        self.writer = None
+
+    def write_batch(self, rows):
+        if self.writer is None:
+            columns = list(dict.fromkeys(k for row in rows for k in row))
+            # utf-8-sig so Excel opens it with the accents intact
+            self.file = open(self.path, "w", newline="", encoding="utf-8-sig")
+            self.writer = csv.DictWriter(self.file, columns, extrasaction="ignore")
+            self.writer.writeheader()
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close_file(self):
+        if self.file:
+            self.file.close()
+
+class NDJSONSink(RowSink):
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write_batch(self, rows):
+        self.file.writelines(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+        self.file.flush()
+
+    def close_file(self):
+        self.file.close()
+
+class ParquetSink(RowSink):
+    """A directory of Parquet files, one per batch (part-00001.parquet, ...),
+    read back as one table by pd.read_parquet. A Parquet file is only
+    readable once its footer is written, so each batch is a complete file
+    and a killed run keeps every batch written before.
+
+    The schema comes from the first batch: columns that are all empty there
+    become strings, and later values of string columns are stringified to fit.
+    """
+
+    def __init__(self, path, batch_size=SINK_BATCH_SIZE):
+        super().__init__(path, batch_size)
+        self.schema = None
+        self.parts = 0
+        # Replaces the output of a previous run, file or directory
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        os.makedirs(path)
+
+    def write_batch(self, rows):
+        if self.schema is None:
+            inferred = pa.Table.from_pylist(rows).schema
+            self.schema = pa.schema(
+                pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in inferred
+            )
+        strings = [f.name for f in self.schema if pa.types.is_string(f.type)]
+        rows = [
+            {**row, **{k: str(row[k]) for k in strings if row.get(k) is not None and not isinstance(row[k], str)}}
+            for row in rows
+        ]
+        self.parts += 1
+        name = f"part-{self.parts:05d}.parquet"
+        # Written under a hidden name (skipped by readers) and renamed when complete
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        pq.write_table(pa.Table.from_pylist(rows, schema=self.schema), tmp_path)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+SINKS = {"parquet": ParquetSink, "csv": CSVSink, "ndjson": NDJSONSink}
+
+def open_sink(stem, fmt=SINK_FORMAT, batch_size=SINK_BATCH_SIZE):
+    """A sink writing to `stem` plus the extension of `fmt`."""
+    return SINKS[fmt](stem + EXTENSIONS[fmt], batch_size)
+
+def read_rows(path):
+    """The rows of a sink output as a DataFrame."""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    if path.endswith(".ndjson"):
+        return pd.read_json(path, lines=True, dtype=False)
+    return pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+
+def export_excel(path, excel_path):
+    """Copies a sink output to an Excel file. Returns the row count."""
+    df = read_rows(path)
+    df.to_excel(excel_path, index=False, engine="openpyxl")
+    return len(df)
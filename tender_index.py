@@ -0,0 +1,104 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+INDEX_FILE = os.environ.get("TENDER_INDEX_FILE", "tender_index.sqlite")
+# Days of publication history re-listed on every run, to catch late edits
+OVERLAP_DAYS = int(os.environ.get("TENDER_INDEX_OVERLAP_DAYS", 30))
+# Set to 1 to ignore the index and reprocess the whole history
+FULL_RUN = os.environ.get("TENDER_INDEX_FULL", "0") == "1"
+
+DATE_FORMAT = "%d/%m/%Y"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenders (
+    name TEXT NOT NULL,
+    reference TEXT NOT NULL,
+    url TEXT NOT NULL,
+    deadline TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    processed_at TEXT,
+    PRIMARY KEY (name, reference, url)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    name TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL
+);
+"""
+
+# -----------------------------
+# PROCESSED TENDER INDEX
+# -----------------------------
+class TenderIndex:
+    """Persistent record of the tenders a script (`name`) already processed.
+
+    A tender is keyed by its reference and detail URL. It counts as
+    modified when the listing shows a different deadline than the one
+    stored when it was processed.
+    """
+
+    def __init__(self, name, path=INDEX_FILE, full=FULL_RUN):
+        self.name = name
+        self.path = path
+        self.full = full
+        self.started_at = datetime.now()
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def search_start_date(self, default):
+        """Listing start date: `default` on the first or a full run, otherwise
+        the previous run's date minus OVERLAP_DAYS."""
+        row = self.conn.execute("SELECT started_at FROM runs WHERE name = ?", (self.name,)).fetchone()
+        if self.full or row is None:
+            return default
+        start = datetime.fromisoformat(row[0]) - timedelta(days=OVERLAP_DAYS)
+        return max(start, datetime.strptime(default, DATE_FORMAT)).strftime(DATE_FORMAT)
+
+    def finish_run(self):
+        """Records a completed run, moving the next search_start_date() forward."""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?)",
+                              (self.name, self.started_at.isoformat(timespec="seconds")))
+
+    def pending(self, rows):
+        """The listing rows that are new or whose deadline changed since processing.
+
+        Every row is also recorded as seen in this run.
+        """
+        now = self.started_at.isoformat(timespec="seconds")
+        pending = []
+        with self.conn:
+            for row in rows:
+                key = (self.name, row["reference"], row["first_button_url"])
+                stored = self.conn.execute(
+                    "SELECT deadline, processed_at FROM tenders WHERE name = ? AND reference = ? AND url = ?", key
+                ).fetchone()
+                if stored is None:
+                    self.conn.execute(
+                        "INSERT INTO tenders (name, reference, url, deadline, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (*key, row["date_limite"], now, now),
+                    )
+                else:
+                    self.conn.execute(
+                        "UPDATE tenders SET last_seen = ? WHERE name = ? AND reference = ? AND url = ?", (now, *key)
+                    )
+                if self.full or stored is None or stored[1] is None or stored[0] != row["date_limite"]:
+                    pending.append(row)
+        print(f"🗂️ {len(pending)}/{len(rows)} tenders are new or modified")
+        return pending
+
+    def mark_processed(self, rows):
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tenders SET deadline = ?, processed_at = ? WHERE name = ? AND reference = ? AND url = ?",
+                [(row["date_limite"], now, self.name, row["reference"], row["first_button_url"]) for row in rows],
+            )
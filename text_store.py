@@ -0,0 +1,86 @@
+"""Compressed store for the full text extracted from each tender's DCE.
+
+    python text_store.py REFERENCE       # print the stored text of a tender
+"""
+import os
+import sys
+import zlib
+import sqlite3
+import hashlib
+from datetime import datetime
+
+# -----------------------------
+# CONFIGURATION
+# -----------------------------
+TEXT_STORE_FILE = os.environ.get("TEXT_STORE_FILE", "tender_texts.sqlite")
+COMPRESSION_LEVEL = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    hash TEXT PRIMARY KEY,
+    length INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tender_texts (
+    reference TEXT NOT NULL,
+    url TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES texts (hash),
+    stored_at TEXT NOT NULL,
+    PRIMARY KEY (reference, url)
+);
+"""
+
+# -----------------------------
+# TEXT STORE
+# -----------------------------
+class TextStore:
+    """Texts are zlib-compressed and stored once per SHA-256, so tenders
+    sharing a DCE share the blob; tender_texts points each tender at the
+    latest text extracted for it."""
+
+    def __init__(self, path=TEXT_STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def put(self, reference, url, text):
+        """Stores `text` for a tender. Returns the columns that replace it in
+        the tabular output: {"text_hash", "text_length"}."""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self.conn:
+            if not self.conn.execute("SELECT 1 FROM texts WHERE hash = ?", (digest,)).fetchone():
+                self.conn.execute(
+                    "INSERT INTO texts VALUES (?, ?, ?)",
+                    (digest, len(text), zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)),
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tender_texts VALUES (?, ?, ?, ?)",
+                (reference, url, digest, datetime.now().isoformat(timespec="seconds")),
+            )
+        return {"text_hash": digest, "text_length": len(text)}
+
+    def get(self, digest):
+        """The text with this hash, or None."""
+        row = self.conn.execute("SELECT data FROM texts WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def texts_for(self, reference):
+        """[(url, text)] stored for a tender reference."""
+        rows = self.conn.execute(
+            "SELECT url, hash FROM tender_texts WHERE reference = ? ORDER BY stored_at", (reference,)
+        ).fetchall()
+        return [(url, self.get(digest)) for url, digest in rows]
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit(__doc__)
+    store = TextStore()
+    found = store.texts_for(sys.argv[1])
+    store.close()
+    if not found:
+        raise SystemExit(f"No text stored for {sys.argv[1]}")
+    for url, text in found:
+        print(f"# {url}\n{text}\n")